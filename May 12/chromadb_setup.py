@@ -1,7 +1,124 @@
-import chromadb
 import uuid
+import queue
+import threading
+import time
+import contextvars
+from contextlib import nullcontext
+from itertools import islice
+from typing import Callable, ContextManager, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+DEFAULT_MAX_BATCH_SIZE = 5000
+
+# Stored for records without metadata when others in the same batch have some
+MISSING_METADATA = {"source": "unknown"}
+
+def _no_span(name: str, **attributes) -> ContextManager:
+    return nullcontext()
+
+def resolve_max_batch_size(client) -> int:
+    """Returns the largest batch the Chroma client accepts in one write."""
+    for attr in ("get_max_batch_size", "max_batch_size"):
+        value = getattr(client, attr, None)
+        try:
+            value = value() if callable(value) else value
+        except Exception:
+            value = None
+        if isinstance(value, int) and value > 0:
+            return value
+    return DEFAULT_MAX_BATCH_SIZE
+
+def bulk_load(collection, records: Iterable[Tuple[str, str, Optional[dict]]],
+              embed_fn: Optional[Callable] = None, batch_size: int = 256,
+              max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+              span: Optional[Callable[..., ContextManager]] = None) -> Dict[str, float]:
+    """
+    Upserts (id, document, metadata) records in batches, embedding batch N+1 while batch N is written.
+    
+    Args:
+        collection: ChromaDB collection object
+        records: Iterable of (id, document, metadata) tuples; metadata may be None
+            (replaced by MISSING_METADATA when other records in the batch have metadata)
+        embed_fn: Optional callable mapping a list of documents to embeddings;
+            when omitted the collection's own embedding function is used
+        batch_size: Records per write, capped at max_batch_size
+        max_batch_size: Largest batch the client accepts (see resolve_max_batch_size)
+        span: Optional tracing hook called as span(name, **attributes) that returns a
+            context manager; each batch's embedding and upsert run inside one
+    
+    Returns:
+        Dict with the number of documents, elapsed seconds and docs per second
+    """
+    batch_size = max(1, min(batch_size, max_batch_size))
+    span = span or _no_span
+    # One batch in flight: the writer thread stores while the caller embeds the next one
+    pending: "queue.Queue" = queue.Queue(maxsize=1)
+    errors = []
+
+    def writer():
+        while True:
+            item = pending.get()
+            if item is None:
+                return
+            if errors:
+                continue
+            try:
+                with span("chroma.upsert", records=len(item["ids"])):
+                    collection.upsert(**item)
+            except Exception as e:
+                errors.append(e)
+
+    # Run the writer in a copy of the caller's context so its spans nest under the caller's
+    writer_thread = threading.Thread(target=contextvars.copy_context().run, args=(writer,),
+                                     name="chroma-bulk-writer", daemon=True)
+    writer_thread.start()
+
+    start = time.perf_counter()
+    total = 0
+    records = iter(records)
+    try:
+        while not errors:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+            ids = [record[0] for record in batch]
+            documents = [record[1] for record in batch]
+            item = {"ids": ids, "documents": documents}
+            if any(record[2] for record in batch):
+                # Chroma rejects empty metadata dicts, so records without metadata get a placeholder
+                item["metadatas"] = [record[2] or dict(MISSING_METADATA) for record in batch]
+            if embed_fn is not None:
+                with span("embed", records=len(documents)):
+                    item["embeddings"] = embed_fn(documents)
+            pending.put(item)
+            total += len(batch)
+    finally:
+        pending.put(None)
+        writer_thread.join()
+
+    if errors:
+        raise errors[0]
+
+    elapsed = time.perf_counter() - start
+    return {
+        "documents": total,
+        "seconds": elapsed,
+        "docs_per_second": total / elapsed if elapsed > 0 else 0.0,
+    }
+
+def initialize_chromadb(document_content=None, metadata=None):
+    """
+    Stores one or more documents in the sample collection.
+    
+    Args:
+        document_content: A document string, a list of them, or None for the built-in sample
+        metadata: One metadata dict for every document, or a list with one dict per document;
+            each document also gets its ID and an ingested_at Unix timestamp
+    
+    Returns:
+        The client and the collection
+    """
+    import chromadb
 
-def initialize_chromadb(document_content=None):
     try:
         # Initialize ChromaDB client with persistent storage
         client = chromadb.PersistentClient(path="./chroma_data")
@@ -12,23 +129,37 @@ def initialize_chromadb(document_content=None):
         # Use provided document content or default
         if document_content is None:
             document_content = "This is a sample document about artificial intelligence and machine learning."
-            metadata = {"author": "Sample Author", "category": "Technology"}
+            if metadata is None:
+                metadata = {"author": "Sample Author", "category": "Technology"}
+        
+        # Accept a single document or a list of documents
+        documents = [document_content] if isinstance(document_content, str) else list(document_content)
+        if isinstance(metadata, (list, tuple)):
+            if len(metadata) != len(documents):
+                raise ValueError("Provide one metadata dict per document.")
+            metadatas = [dict(m or {}) for m in metadata]
         else:
-            metadata = {"author": "Internet", "category": "Fiction"}
+            metadatas = [dict(metadata or {}) for _ in documents]
+        # doc_id and ingested_at below also keep every metadata dict non-empty, as Chroma requires
         
-        # Sample document data
-        document_id = str(uuid.uuid4())
+        ingested_at = int(time.time())
+        records = []
+        for document, document_metadata in zip(documents, metadatas):
+            document_id = str(uuid.uuid4())
+            document_metadata.setdefault("doc_id", document_id)
+            document_metadata.setdefault("ingested_at", ingested_at)
+            records.append((document_id, document, document_metadata))
         
-        # Add the document to the collection
-        collection.add(
-            documents=[document_content],
-            metadatas=[metadata],
-            ids=[document_id]
-        )
+        # Add the documents to the collection in bulk
+        stats = bulk_load(collection, records, max_batch_size=resolve_max_batch_size(client))
         
-        print(f"Successfully added document with ID: {document_id}")
-        print("Document content:", document_content)
-        print("Metadata:", metadata)
+        for document_id, document, document_metadata in records[:5]:
+            print(f"Successfully added document with ID: {document_id}")
+            print("Document content:", document)
+            print("Metadata:", document_metadata)
+        if len(records) > 5:
+            print(f"... and {len(records) - 5} more documents")
+        print(f"Loaded {stats['documents']} documents at {stats['docs_per_second']:.1f} docs/s")
         
         return client, collection
     
@@ -36,21 +167,58 @@ def initialize_chromadb(document_content=None):
         print(f"Error initializing ChromaDB or storing document: {str(e)}")
         raise
 
-def list_all_documents(collection):
+def iter_documents(collection, page_size: int = 500, where: Optional[dict] = None,
+                   where_document: Optional[dict] = None,
+                   include: Sequence[str] = ("documents", "metadatas")) -> Iterator[Dict]:
+    """
+    Iterates over records in the collection one page at a time.
+    
+    Args:
+        collection: ChromaDB collection object
+        page_size: Records fetched per get() call
+        where: Optional metadata filter, e.g. {"category": "Fiction"}
+        where_document: Optional document content filter, e.g. {"$contains": "river"}
+        include: Fields to fetch besides IDs; pass () for IDs only
+    
+    Yields:
+        Dicts with an "id" key plus one singular key per included field
+        ("document", "metadata", "embedding")
+    """
+    include = list(include)
+    offset = 0
+    while True:
+        page = collection.get(
+            where=where,
+            where_document=where_document,
+            limit=page_size,
+            offset=offset,
+            include=include
+        )
+        ids = page["ids"]
+        for i, doc_id in enumerate(ids):
+            record = {"id": doc_id}
+            for field in include:
+                values = page.get(field)
+                record[field[:-1]] = values[i] if values is not None else None
+            yield record
+        if len(ids) < page_size:
+            return
+        offset += page_size
+
+def list_all_documents(collection, where: Optional[dict] = None):
     """
     List all documents in the collection.
     
     Args:
         collection: ChromaDB collection object
+        where: Optional metadata filter
     """
     try:
-        # Query all documents (using a generic query to retrieve everything)
-        results = collection.query(query_texts=[""], n_results=collection.count())
         print("\nAll Documents in Collection:")
-        for i, (doc, meta, doc_id) in enumerate(zip(results["documents"], results["metadatas"], results["ids"])):
-            print(f"Document {i+1} (ID: {doc_id}):")
-            print(f"Content: {doc}")
-            print(f"Metadata: {meta}")
+        for i, record in enumerate(iter_documents(collection, where=where)):
+            print(f"Document {i+1} (ID: {record['id']}):")
+            print(f"Content: {record['document']}")
+            print(f"Metadata: {record['metadata']}")
             print("-" * 50)
     except Exception as e:
         print(f"Error listing documents: {str(e)}")
@@ -66,11 +234,12 @@ if __name__ == "__main__":
         )
         
         # Initialize ChromaDB and store document
-        client, collection = initialize_chromadb(document_content=custom_document)
+        client, collection = initialize_chromadb(document_content=custom_document,
+                                                 metadata={"author": "Internet", "category": "Fiction"})
         
         # Query the collection to verify the document
         query_text = "green river"  # Adjusted to match the document
-        results = collection.query(query_texts=[query_text], n_results=1)
+        results = collection.query(query_texts=[query_text], n_results=1, where={"category": "Fiction"})
         print("\nQuery Results:")
         print(f"Query: {query_text}")
         print("Retrieved document:", results["documents"])
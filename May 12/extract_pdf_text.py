@@ -1,33 +1,94 @@
-import fitz
 import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
 
-def extract_pdf_text(filepath):
+def _validate_pdf_path(filepath):
     # Check if file exists
     if not os.path.exists(filepath):
         raise FileNotFoundError(f"PDF file not found at: {filepath}")
-    
+
     # Check if file is a PDF
     if not filepath.lower().endswith('.pdf'):
         raise ValueError("File must be a PDF document")
-    
+
+def iter_pdf_pages(filepath, start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+    """Yields the text of each page as it is read, without holding the whole document."""
+    # Imported here so that importing this module does not load PyMuPDF
+    import fitz
+
+    _validate_pdf_path(filepath)
+
     try:
-        # Open the PDF
         pdf_document = fitz.open(filepath)
-        text = ""
-        
-        # Iterate through all pages
-        for page_num in range(pdf_document.page_count):
-            page = pdf_document[page_num]
-            # Extract text from the page
-            text += page.get_text() + "\n"
-            
-        # Close the document
+    except Exception as e:
+        raise ValueError(f"Error processing PDF: {str(e)}")
+
+    try:
+        end = pdf_document.page_count if end is None else min(end, pdf_document.page_count)
+        for page_num in range(start, end):
+            try:
+                page_text = pdf_document[page_num].get_text()
+            except Exception as e:
+                raise ValueError(f"Error processing PDF page {page_num + 1}: {str(e)}")
+            yield page_text
+    finally:
         pdf_document.close()
-        return text.strip()
-    
+
+def _extract_page_range(args: Tuple[str, int, int]) -> List[str]:
+    # Runs in a worker process; each worker opens its own fitz document
+    filepath, start, end = args
+    return list(iter_pdf_pages(filepath, start, end))
+
+def iter_pdf_pages_parallel(filepath, workers: Optional[int] = None, pages_per_task: int = 16) -> Iterator[str]:
+    """Yields page texts in order while page ranges are extracted across a process pool.
+
+    Only a bounded window of ranges is in flight, so a slow consumer keeps memory flat
+    instead of letting finished ranges pile up.
+    """
+    import fitz
+
+    _validate_pdf_path(filepath)
+
+    try:
+        with fitz.open(filepath) as pdf_document:
+            page_count = pdf_document.page_count
     except Exception as e:
         raise ValueError(f"Error processing PDF: {str(e)}")
 
+    ranges = [
+        (filepath, start, min(start + pages_per_task, page_count))
+        for start in range(0, page_count, pages_per_task)
+    ]
+    if len(ranges) <= 1 or workers == 1:
+        yield from iter_pdf_pages(filepath)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        max_in_flight = 2 * (workers or os.cpu_count() or 1)
+        remaining = iter(ranges)
+        in_flight = deque()
+        for page_range in remaining:
+            in_flight.append(executor.submit(_extract_page_range, page_range))
+            if len(in_flight) >= max_in_flight:
+                break
+        while in_flight:
+            page_texts = in_flight.popleft().result()
+            page_range = next(remaining, None)
+            if page_range is not None:
+                in_flight.append(executor.submit(_extract_page_range, page_range))
+            yield from page_texts
+
+def extract_pdf_text(filepath, workers: Optional[int] = 1):
+    """Returns the full text of a PDF; workers > 1 (or None for all cores) extracts in parallel."""
+    if workers == 1:
+        pages = iter_pdf_pages(filepath)
+    else:
+        pages = iter_pdf_pages_parallel(filepath, workers=workers)
+
+    # Join once at the end instead of growing a string page by page
+    return "\n".join(pages).strip()
+
 if __name__ == "__main__":
     try:
         pdf_path = "Book_sample.pdf"
@@ -36,6 +97,6 @@ if __name__ == "__main__":
         print("-" * 50)
         print(extracted_text)
         print("-" * 50)
-        
+
     except (FileNotFoundError, ValueError) as e:
-        print(f"Error: {str(e)}")
\ No newline at end of file
+        print(f"Error: {str(e)}")
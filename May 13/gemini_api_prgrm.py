@@ -1,7 +1,8 @@
 import os
-import google.generativeai as genai
 from google.api_core.exceptions import GoogleAPIError
 
+from gemini_client import get_gemini_client
+
 def call_gemini_api(prompt: str, api_key: str, model_name: str = "gemini-1.5-flash") -> str:
     if not prompt.strip():
         raise ValueError("Prompt cannot be empty.")
@@ -9,18 +10,12 @@ def call_gemini_api(prompt: str, api_key: str, model_name: str = "gemini-1.5-fla
         raise ValueError("API key cannot be empty.")
     
     try:
-        # Configure the API with the key
-        genai.configure(api_key=api_key)
-        
-        # Initialize the model
-        model = genai.GenerativeModel(model_name)
-        
-        # Send the prompt and get the response
-        response = model.generate_content(prompt)
+        # Reuse the configured client and model across calls; transient errors are retried
+        response = get_gemini_client(api_key).generate_sync(prompt, model_name)
         
         # Extract the text from the response
-        if response.text:
-            return response.text.strip()
+        if response:
+            return response
         else:
             return "No valid response received from the Gemini API."
     
@@ -0,0 +1,243 @@
+import asyncio
+import random
+import threading
+import time
+import weakref
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+import google.generativeai as genai
+from google.api_core import exceptions as api_exceptions
+
+DEFAULT_MODEL_NAME = "gemini-1.5-flash"
+
+# Rate limits and server-side hiccups are worth retrying; bad requests are not
+RETRYABLE_ERRORS = (
+    api_exceptions.ResourceExhausted,
+    api_exceptions.TooManyRequests,
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.InternalServerError,
+    api_exceptions.DeadlineExceeded,
+    asyncio.TimeoutError,
+    TimeoutError,
+    ConnectionError,
+)
+
+
+# google.generativeai keeps a single API key in process-global state, so every
+# request uses whichever key was configured last; one key per process is enforced
+_configured_key: Optional[str] = None
+_configure_lock = threading.Lock()
+
+
+def _configure(api_key: str):
+    global _configured_key
+    with _configure_lock:
+        if _configured_key is None:
+            genai.configure(api_key=api_key)
+            _configured_key = api_key
+        elif _configured_key != api_key:
+            raise ValueError("A different Gemini API key is already configured in this process; "
+                             "google.generativeai supports only one key per process.")
+
+
+def _response_text(response) -> str:
+    text = response.text
+    return text.strip() if text else ""
+
+
+class GeminiClient:
+    """Long-lived Gemini client: one GenerativeModel per model name, bounded
+    concurrency, jittered exponential backoff and a deadline per call.
+
+    max_concurrency caps the sync methods across all threads and, separately, the
+    async methods within each event loop; a process that mixes both styles can have
+    up to max_concurrency requests of each in flight.
+
+    All clients in a process must use the same API key (see _configure).
+    """
+
+    def __init__(self, api_key: str, max_concurrency: int = 4, max_retries: int = 5,
+                 base_delay: float = 1.0, max_delay: float = 30.0, timeout: float = 60.0,
+                 on_retry: Optional[Callable[[Exception], None]] = None):
+        if not api_key:
+            raise ValueError("API key cannot be empty.")
+        _configure(api_key)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.retries = 0
+        # Called with the error before each retry, e.g. to count retries in a metrics system
+        self.on_retry = on_retry
+        self._models: Dict[str, "genai.GenerativeModel"] = {}
+        self._models_lock = threading.Lock()
+        self._sync_semaphore = threading.BoundedSemaphore(max_concurrency)
+        # Keyed by the loop itself so a closed loop's semaphore goes away with it
+        self._async_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = \
+            weakref.WeakKeyDictionary()
+
+    def model(self, model_name: str = DEFAULT_MODEL_NAME):
+        """Returns the cached GenerativeModel for a model name."""
+        with self._models_lock:
+            model = self._models.get(model_name)
+            if model is None:
+                model = genai.GenerativeModel(model_name)
+                self._models[model_name] = model
+            return model
+
+    def _retrying(self, error: Exception):
+        self.retries += 1
+        if self.on_retry is not None:
+            self.on_retry(error)
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform in [0, min(max_delay, base * 2^attempt)]
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # asyncio primitives belong to one event loop
+        loop = asyncio.get_running_loop()
+        semaphore = self._async_semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._async_semaphores[loop] = semaphore
+        return semaphore
+
+    async def generate(self, prompt: str, model_name: str = DEFAULT_MODEL_NAME,
+                       timeout: Optional[float] = None) -> str:
+        """Generates a response (empty if the model returned no text), retrying transient failures until the call's deadline."""
+        if not prompt.strip():
+            raise ValueError("Prompt cannot be empty.")
+        deadline = time.monotonic() + (timeout or self.timeout)
+        model = self.model(model_name)
+
+        async with self._semaphore():
+            for attempt in range(self.max_retries + 1):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise api_exceptions.DeadlineExceeded("Gemini call exceeded its deadline.")
+                try:
+                    response = await asyncio.wait_for(model.generate_content_async(prompt), remaining)
+                    return _response_text(response)
+                except RETRYABLE_ERRORS as e:
+                    delay = self._backoff(attempt)
+                    if attempt == self.max_retries or time.monotonic() + delay >= deadline:
+                        raise
+                    self._retrying(e)
+                    await asyncio.sleep(delay)
+
+    async def stream(self, prompt: str, model_name: str = DEFAULT_MODEL_NAME,
+                     timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Yields response text as it arrives. Only the wait for the first chunk is retried;
+        once text has been yielded a failure is raised to the caller."""
+        if not prompt.strip():
+            raise ValueError("Prompt cannot be empty.")
+        deadline = time.monotonic() + (timeout or self.timeout)
+        model = self.model(model_name)
+
+        async with self._semaphore():
+            for attempt in range(self.max_retries + 1):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise api_exceptions.DeadlineExceeded("Gemini call exceeded its deadline.")
+                try:
+                    response = await asyncio.wait_for(
+                        model.generate_content_async(prompt, stream=True), remaining
+                    )
+                    chunks = response.__aiter__()
+                    first = await asyncio.wait_for(chunks.__anext__(), deadline - time.monotonic())
+                    break
+                except StopAsyncIteration:
+                    return
+                except RETRYABLE_ERRORS as e:
+                    delay = self._backoff(attempt)
+                    if attempt == self.max_retries or time.monotonic() + delay >= deadline:
+                        raise
+                    self._retrying(e)
+                    await asyncio.sleep(delay)
+
+            if first.text:
+                yield first.text
+            async for chunk in chunks:
+                if chunk.text:
+                    yield chunk.text
+
+    async def generate_many(self, prompts: List[str], model_name: str = DEFAULT_MODEL_NAME) -> List[str]:
+        """Generates responses for several prompts concurrently, up to max_concurrency at a time."""
+        return await asyncio.gather(*(self.generate(prompt, model_name) for prompt in prompts))
+
+    def generate_sync(self, prompt: str, model_name: str = DEFAULT_MODEL_NAME,
+                      timeout: Optional[float] = None) -> str:
+        """Blocking counterpart of generate() for synchronous callers."""
+        if not prompt.strip():
+            raise ValueError("Prompt cannot be empty.")
+        deadline = time.monotonic() + (timeout or self.timeout)
+        model = self.model(model_name)
+
+        with self._sync_semaphore:
+            for attempt in range(self.max_retries + 1):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise api_exceptions.DeadlineExceeded("Gemini call exceeded its deadline.")
+                try:
+                    response = model.generate_content(prompt, request_options={"timeout": remaining})
+                    return _response_text(response)
+                except RETRYABLE_ERRORS as e:
+                    delay = self._backoff(attempt)
+                    if attempt == self.max_retries or time.monotonic() + delay >= deadline:
+                        raise
+                    self._retrying(e)
+                    time.sleep(delay)
+
+    def stream_sync(self, prompt: str, model_name: str = DEFAULT_MODEL_NAME,
+                    timeout: Optional[float] = None) -> Iterator[str]:
+        """Blocking counterpart of stream(); yields response text as it arrives."""
+        if not prompt.strip():
+            raise ValueError("Prompt cannot be empty.")
+        deadline = time.monotonic() + (timeout or self.timeout)
+        model = self.model(model_name)
+
+        with self._sync_semaphore:
+            for attempt in range(self.max_retries + 1):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise api_exceptions.DeadlineExceeded("Gemini call exceeded its deadline.")
+                try:
+                    response = model.generate_content(
+                        prompt, stream=True, request_options={"timeout": remaining}
+                    )
+                    chunks = iter(response)
+                    first = next(chunks)
+                    break
+                except StopIteration:
+                    return
+                except RETRYABLE_ERRORS as e:
+                    delay = self._backoff(attempt)
+                    if attempt == self.max_retries or time.monotonic() + delay >= deadline:
+                        raise
+                    self._retrying(e)
+                    time.sleep(delay)
+
+            if first.text:
+                yield first.text
+            for chunk in chunks:
+                if chunk.text:
+                    yield chunk.text
+
+
+_clients: Dict[str, GeminiClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_gemini_client(api_key: str, **kwargs) -> GeminiClient:
+    """Returns the process-wide client for an API key, creating it on first use.
+
+    Raises ValueError for a second, different key, since the SDK holds one key per process.
+    """
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = GeminiClient(api_key, **kwargs)
+            _clients[api_key] = client
+        return client
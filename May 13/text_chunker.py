@@ -1,82 +1,154 @@
-import fitz
-from typing import List
+from typing import Callable, Iterable, Iterator, List, Optional
 import re
 
-def chunk_pdf_text(pdf_path: str, max_tokens: int = 256, min_chunk_size: int = 25) -> List[str]:
+WORDS_PER_TOKEN = 0.75  # Approximate: 1 token ≈ 0.75 words
+
+_PARAGRAPH_BREAK = re.compile(r'\n\s*\n+')
+
+def estimate_tokens(text: str) -> float:
+    """Estimates token count from the word count (word count / words_per_token)."""
+    return len(text.split()) / WORDS_PER_TOKEN
+
+def make_token_counter(tokenizer) -> Callable[[str], int]:
+    """Wraps a Hugging Face style tokenizer (e.g. SentenceTransformer.tokenizer) as an exact token counter."""
+    def count_tokens(text: str) -> int:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+    return count_tokens
+
+def _iter_paragraphs(pages: Iterable[str]) -> Iterator[str]:
+    # Page boundaries always count as paragraph breaks
+    for page_text in pages:
+        for para in _PARAGRAPH_BREAK.split(page_text or ""):
+            para = para.strip()
+            if para:
+                yield para
+
+def _overlap_tail(words: List[str], word_tokens: List[float], overlap_tokens: int):
+    # Trailing words of the previous chunk that fit within the overlap window
+    start = len(words)
+    total = 0.0
+    while start > 0 and total + word_tokens[start - 1] <= overlap_tokens:
+        start -= 1
+        total += word_tokens[start]
+    return words[start:], word_tokens[start:], total
+
+def iter_chunks(
+    pages: Iterable[str],
+    max_tokens: int = 256,
+    min_chunk_size: int = 25,
+    overlap_tokens: int = 0,
+    token_counter: Optional[Callable[[str], float]] = None,
+) -> Iterator[str]:
+    """Yields chunks from an iterator of page texts as soon as each chunk is complete.
+
+    Paragraphs are packed into chunks of at most max_tokens; paragraphs that are too
+    large on their own are split on word boundaries. With overlap_tokens > 0 each chunk
+    starts with the trailing words of the previous one. token_counter defaults to the
+    0.75 words-per-token estimate; pass make_token_counter(tokenizer) for exact counts.
+    """
+    if overlap_tokens < 0 or overlap_tokens >= max_tokens:
+        raise ValueError("overlap_tokens must be between 0 and max_tokens - 1.")
+
+    count_tokens = token_counter or estimate_tokens
+    word_cost = None if token_counter else 1 / WORDS_PER_TOKEN
+
+    # Current chunk, kept as list buffers and joined once when emitted
+    parts: List[str] = []
+    token_count = 0.0
+    tail_words: List[str] = []
+    tail_tokens: List[float] = []
+
+    def word_token_counts(words: List[str]) -> List[float]:
+        if word_cost is not None:
+            return [word_cost] * len(words)
+        return [count_tokens(word) for word in words]
+
+    def emit(text: str) -> Iterator[str]:
+        nonlocal tail_words, tail_tokens
+        if len(text) >= min_chunk_size:
+            yield text
+        if overlap_tokens:
+            words = text.split()
+            tail_words, tail_tokens, _ = _overlap_tail(words, word_token_counts(words), overlap_tokens)
+
+    def start_with_overlap():
+        # Seeds a new chunk with the previous chunk's tail
+        if not tail_words:
+            return [], 0.0
+        return [" ".join(tail_words)], sum(tail_tokens)
+
+    for para in _iter_paragraphs(pages):
+        para_tokens = count_tokens(para)
+
+        # If paragraph is too large, split into smaller chunks on word boundaries
+        if para_tokens > max_tokens:
+            if parts:
+                yield from emit("\n\n".join(parts))
+                parts, token_count = [], 0.0
+
+            words = para.split()
+            costs = word_token_counts(words)
+            buf_words, buf_tokens, buf_total = list(tail_words), list(tail_tokens), sum(tail_tokens)
+            carried = len(buf_words)
+            for word, cost in zip(words, costs):
+                if buf_total + cost > max_tokens:
+                    if len(buf_words) > carried:
+                        yield from emit(" ".join(buf_words))
+                        buf_words, buf_tokens, buf_total = list(tail_words), list(tail_tokens), sum(tail_tokens)
+                        carried = len(buf_words)
+                    if buf_total + cost > max_tokens:
+                        buf_words, buf_tokens, buf_total, carried = [], [], 0.0, 0
+                buf_words.append(word)
+                buf_tokens.append(cost)
+                buf_total += cost
+            if buf_words:
+                yield from emit(" ".join(buf_words))
+            continue
+
+        # If adding paragraph exceeds max_tokens, save current chunk and start new one
+        if parts and token_count + para_tokens > max_tokens:
+            yield from emit("\n\n".join(parts))
+            parts, token_count = start_with_overlap()
+            if token_count + para_tokens > max_tokens:
+                parts, token_count = [], 0.0
+
+        parts.append(para)
+        token_count += para_tokens
+
+    # Add the final chunk if it meets the minimum size
+    if parts:
+        yield from emit("\n\n".join(parts))
+
+def chunk_pdf_text(pdf_path: str, max_tokens: int = 256, min_chunk_size: int = 25,
+                   overlap_tokens: int = 0, token_counter: Optional[Callable[[str], float]] = None) -> List[str]:
+    import fitz
+
     try:
         # Open the PDF file
         doc = fitz.open(pdf_path)
         if doc.page_count == 0:
             doc.close()
             raise ValueError("PDF is empty or contains no pages.")
-        
-        # Extract text from all pages
-        text = ""
-        for page in doc:
-            page_text = page.get_text("text") or ""
-            text += page_text + "\n\n"
-        
-        doc.close()
-        
-        if not text.strip():
+
+        saw_text = False
+
+        def pages():
+            nonlocal saw_text
+            try:
+                for page in doc:
+                    page_text = page.get_text("text") or ""
+                    saw_text = saw_text or bool(page_text.strip())
+                    yield page_text
+            finally:
+                doc.close()
+
+        chunks = list(iter_chunks(pages(), max_tokens, min_chunk_size, overlap_tokens, token_counter))
+
+        if not saw_text:
             raise ValueError("No text could be extracted from the PDF.")
-        
-        # Clean text: replace multiple newlines with double newlines for paragraph detection
-        text = re.sub(r'\n\s*\n+', '\n\n', text.strip())
-        
-        # Split into paragraphs based on double newlines
-        paragraphs = text.split('\n\n')
-        chunks = []
-        current_chunk = ""
-        current_token_count = 0
-        words_per_token = 0.75  # Approximate: 1 token ≈ 0.75 words
-        
-        for para in paragraphs:
-            para = para.strip()
-            if not para:
-                continue
-                
-            # Estimate token count for the paragraph (word count / words_per_token)
-            word_count = len(para.split())
-            token_count = word_count / words_per_token
-            
-            # If paragraph is too large, split into smaller chunks
-            if token_count > max_tokens:
-                words = para.split()
-                temp_chunk = ""
-                temp_token_count = 0
-                
-                for word in words:
-                    word_token_count = 1 / words_per_token
-                    if temp_token_count + word_token_count > max_tokens:
-                        if len(temp_chunk) >= min_chunk_size:
-                            chunks.append(temp_chunk.strip())
-                        temp_chunk = word
-                        temp_token_count = word_token_count
-                    else:
-                        temp_chunk += " " + word
-                        temp_token_count += word_token_count
-                
-                if len(temp_chunk.strip()) >= min_chunk_size:
-                    chunks.append(temp_chunk.strip())
-                continue
-            
-            # If adding paragraph exceeds max_tokens, save current chunk and start new one
-            if current_token_count + token_count > max_tokens:
-                if len(current_chunk) >= min_chunk_size:
-                    chunks.append(current_chunk.strip())
-                current_chunk = para
-                current_token_count = token_count
-            else:
-                current_chunk += "\n\n" + para if current_chunk else para
-                current_token_count += token_count
-        
-        # Add the final chunk if it meets the minimum size
-        if len(current_chunk.strip()) >= min_chunk_size:
-            chunks.append(current_chunk.strip())
-        
+
         return chunks if chunks else ["No valid chunks created."]
-    
+
     except FileNotFoundError:
         raise FileNotFoundError(f"PDF file not found at: {pdf_path}")
     except Exception as e:
@@ -88,4 +160,4 @@ if __name__ == "__main__":
         for i, chunk in enumerate(chunks, 1):
             print(f"Chunk {i}:\n{chunk}\n{'-'*50}")
     except Exception as e:
-        print(f"Error: {str(e)}")
\ No newline at end of file
+        print(f"Error: {str(e)}")
@@ -0,0 +1,173 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+def make_answer_key(model_name: str, prompt_template: str, context_ids: Sequence[str]) -> str:
+    """Hash of everything besides the question that determines the LLM's answer."""
+    payload = json.dumps([model_name, prompt_template, list(context_ids)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _normalize(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+class AnswerCache:
+    """LLM answer cache for questions asked over the same retrieved context.
+
+    Entries live under a context key (see make_answer_key). A lookup hits when the
+    normalized question matches exactly or, if similarity_threshold is set, when the
+    cosine similarity of the query embeddings reaches the threshold. Entries expire
+    after ttl_seconds and the least recently used are evicted beyond max_items.
+    Passing path persists the cache between runs as an append-only JSON-lines log:
+    each put appends one line outside the lookup lock, and the log is compacted on
+    load and whenever it grows past twice max_items lines.
+    """
+
+    def __init__(self, max_items: int = 1024, ttl_seconds: float = 24 * 3600,
+                 similarity_threshold: Optional[float] = None, path: Optional[str] = None):
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.path = path
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Serializes writes to the log file; never held together with _lock while writing
+        self._file_lock = threading.Lock()
+        self._log_lines = 0
+        if path:
+            self._load()
+
+    def _load(self):
+        if not os.path.isfile(self.path):
+            return
+        lines = 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    if isinstance(record, list):
+                        # Files written before the log format hold one JSON array of entries;
+                        # counting it as extra lines makes this load rewrite it as a log
+                        records, lines = record, lines + len(record) + 1
+                    else:
+                        records, lines = [record], lines + 1
+                    for entry in records:
+                        entry_key = self._entry_key(entry["key"], entry["query"])
+                        self._entries[entry_key] = entry
+                        self._entries.move_to_end(entry_key)
+        except (OSError, ValueError, KeyError, TypeError):
+            # A corrupt log only costs the cached answers
+            self._entries.clear()
+            lines = 0
+
+        now = time.time()
+        for entry_key in [k for k, entry in self._entries.items() if self._expired(entry, now)]:
+            del self._entries[entry_key]
+        while len(self._entries) > self.max_items:
+            self._entries.popitem(last=False)
+        self._log_lines = lines
+        if lines != len(self._entries):
+            self.compact()
+
+    def compact(self):
+        """Rewrites the log with only the live entries."""
+        if not self.path:
+            return
+        with self._file_lock:
+            with self._lock:
+                entries = list(self._entries.values())
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry) + "\n")
+            os.replace(tmp_path, self.path)
+            self._log_lines = len(entries)
+
+    def _append(self, entry: Dict):
+        line = json.dumps(entry) + "\n"
+        with self._file_lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+            self._log_lines += 1
+            needs_compaction = self._log_lines > 2 * max(self.max_items, 1)
+        if needs_compaction:
+            self.compact()
+
+    @staticmethod
+    def _entry_key(key: str, query: str) -> str:
+        return f"{key}\0{_normalize(query)}"
+
+    def _expired(self, entry: Dict, now: float) -> bool:
+        return now - entry["created"] > self.ttl_seconds
+
+    def get(self, key: str, query: str, query_embedding=None) -> Optional[str]:
+        """Returns a cached answer for the question over this context, or None."""
+        now = time.time()
+        with self._lock:
+            entry_key = self._entry_key(key, query)
+            entry = self._entries.get(entry_key)
+            if entry is not None and self._expired(entry, now):
+                del self._entries[entry_key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(entry_key)
+                self.hits += 1
+                return entry["answer"]
+
+            if self.similarity_threshold is not None and query_embedding is not None:
+                entry_key = self._most_similar(key, query_embedding, now)
+                if entry_key is not None:
+                    self._entries.move_to_end(entry_key)
+                    self.hits += 1
+                    self.similar_hits += 1
+                    return self._entries[entry_key]["answer"]
+
+            self.misses += 1
+            return None
+
+    def _most_similar(self, key: str, query_embedding, now: float) -> Optional[str]:
+        query_vec = np.asarray(query_embedding, dtype=np.float32)
+        query_norm = np.linalg.norm(query_vec) or 1.0
+        best_key, best_score = None, self.similarity_threshold
+        for entry_key, entry in self._entries.items():
+            if entry["key"] != key or entry.get("embedding") is None or self._expired(entry, now):
+                continue
+            vec = np.asarray(entry["embedding"], dtype=np.float32)
+            score = float(vec @ query_vec) / ((np.linalg.norm(vec) or 1.0) * query_norm)
+            if score >= best_score:
+                best_key, best_score = entry_key, score
+        return best_key
+
+    def put(self, key: str, query: str, answer: str, query_embedding=None):
+        """Stores an answer, evicting the least recently used entries beyond max_items."""
+        embedding: Optional[List[float]] = None
+        if query_embedding is not None:
+            embedding = np.asarray(query_embedding, dtype=np.float32).tolist()
+        entry = {"key": key, "query": query, "answer": answer, "embedding": embedding, "created": time.time()}
+        with self._lock:
+            entry_key = self._entry_key(key, query)
+            self._entries[entry_key] = entry
+            self._entries.move_to_end(entry_key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+        # Lookups are not blocked while the entry is written
+        if self.path:
+            self._append(entry)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "similar_hits": self.similar_hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0, "entries": len(self._entries)}
@@ -0,0 +1,82 @@
+import asyncio
+import json
+from typing import Dict, List, Optional, Tuple
+
+from embedding_service import get_embedding_service
+
+
+class AsyncBatchRetriever:
+    """Micro-batches concurrent retrieval requests against one collection.
+
+    Queries that arrive within max_wait seconds of each other (up to max_batch_size)
+    are embedded in one forward pass and sent to Chroma as one multi-query call
+    per distinct `where` filter; each caller gets back its own top-k documents.
+    """
+
+    def __init__(self, collection, top_k: int = 3, max_batch_size: int = 32,
+                 max_wait: float = 0.005, embedder=None):
+        self.collection = collection
+        self.top_k = top_k
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.embedder = embedder or get_embedding_service()
+        self._pending: List[Tuple[str, int, Optional[Dict], asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    async def retrieve(self, query: str, top_k: Optional[int] = None, where: Optional[Dict] = None) -> List[str]:
+        """Returns the most relevant chunks for a query (matching the optional metadata filter),
+        batched with concurrent callers."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((query, top_k or self.top_k, where or None, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._run_batch(batch))
+
+    async def _run_batch(self, batch: List[Tuple[str, int, Optional[Dict], asyncio.Future]]):
+        try:
+            # Embedding and Chroma calls block, so they run off the event loop
+            documents = await asyncio.to_thread(self._query, batch)
+        except Exception as e:
+            error = ValueError(f"Error retrieving chunks from ChromaDB: {str(e)}")
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        for (_, top_k, _, future), docs in zip(batch, documents):
+            if not future.done():
+                future.set_result(list(docs[:top_k]))
+
+    def _query(self, batch: List[Tuple[str, int, Optional[Dict], asyncio.Future]]) -> List[List[str]]:
+        embeddings = self.embedder.encode([query for query, _, _, _ in batch])
+        # Chroma applies one filter per call, so queries are grouped by filter
+        groups: Dict[str, List[int]] = {}
+        for i, (_, _, where, _) in enumerate(batch):
+            groups.setdefault(json.dumps(where, sort_keys=True), []).append(i)
+        documents: List[List[str]] = [[] for _ in batch]
+        for members in groups.values():
+            results = self.collection.query(query_embeddings=[embeddings[i] for i in members],
+                                            n_results=max(batch[i][1] for i in members),
+                                            where=batch[members[0]][2])
+            for i, docs in zip(members, results.get("documents") or []):
+                documents[i] = docs
+        return documents
+
+
+async def retrieve_many(queries: List[str], collection, top_k: int = 3,
+                        where: Optional[Dict] = None) -> List[List[str]]:
+    """Retrieves chunks for several queries concurrently through one batching retriever."""
+    retriever = AsyncBatchRetriever(collection, top_k=top_k)
+    return await asyncio.gather(*(retriever.retrieve(query, where=where) for query in queries))
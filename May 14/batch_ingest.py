@@ -0,0 +1,216 @@
+import argparse
+import glob
+import os
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional
+
+import pdf_pipeline
+from chromadb_setup import bulk_load, resolve_max_batch_size
+from embedding_cache import EmbeddingCache
+from embedding_service import BACKENDS, set_default_backend
+from hybrid_search import get_bm25_index
+from ingest_cache import DEFAULT_TENANT, chunk_id, compute_ingest_key, document_id, load_manifest, save_manifest
+
+_DONE = object()
+
+
+def expand_pdf_paths(patterns: List[str]) -> List[str]:
+    """Expands directories (recursively) and glob patterns into a sorted list of unique PDF paths."""
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, _, files in os.walk(pattern):
+                paths.update(os.path.join(root, name) for name in files if name.lower().endswith(".pdf"))
+        else:
+            matches = glob.glob(pattern, recursive=True) or ([pattern] if os.path.isfile(pattern) else [])
+            paths.update(path for path in matches if path.lower().endswith(".pdf") and os.path.isfile(path))
+    return sorted(os.path.abspath(path) for path in paths)
+
+
+def extract_document(pdf_path: str, chunker_params: Dict, previous_key: Optional[str]) -> Dict:
+    """Runs in a worker process: hashes, extracts and chunks one PDF.
+
+    Returns the ingest key and, unless the key matches previous_key, the chunk records
+    of pdf_pipeline.iter_chunk_records (text, page range, chunk index and section).
+    """
+    key = compute_ingest_key(pdf_path, chunker_params)
+    if key == previous_key:
+        return {"path": pdf_path, "ingest_key": key, "unchanged": True, "chunks": []}
+
+    chunks = list(pdf_pipeline.iter_chunk_records(pdf_path, **chunker_params))
+    return {"path": pdf_path, "ingest_key": key, "unchanged": False, "chunks": chunks}
+
+
+def ingest_paths(pdf_paths: List[str], collection_name: str, persist_dir: str = "./chroma_db",
+                 workers: Optional[int] = None, queue_size: int = 8, batch_size: int = 256,
+                 max_tokens: int = 512, min_chunk_size: int = 50, overlap_tokens: int = 0,
+                 tenant: Optional[str] = None) -> Dict:
+    """Ingests many PDFs: extraction and chunking in a process pool, one embedding thread fed
+    through a bounded queue, and bulk upserts with pdf_pipeline.chunk_metadata for every chunk.
+    New chunks are also added to the collection's BM25 index."""
+    tenant = tenant or DEFAULT_TENANT
+    ingested_at = int(time.time())
+    chunker_params = {"max_tokens": max_tokens, "min_chunk_size": min_chunk_size, "overlap_tokens": overlap_tokens}
+    manifest = load_manifest(persist_dir)
+    entries = manifest.setdefault(collection_name, {})
+    client = pdf_pipeline.get_chroma_client(persist_dir)
+    collection = client.get_or_create_collection(name=collection_name)
+    embedder = pdf_pipeline.get_embedding_service()
+    bm25_index = get_bm25_index(persist_dir, collection_name)
+
+    # Extracted documents wait here for the embedding thread; the bound keeps memory flat
+    documents: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    summary = {"documents": len(pdf_paths), "unchanged": 0, "ingested": 0, "failed": 0,
+               "chunks": 0, "embedded": 0, "removed": 0}
+    stale_ids: List[str] = []
+    load_stats: Dict = {}
+    load_errors: List[Exception] = []
+    # Metadata of kept chunks, refreshed after the load without re-embedding
+    moved: Dict[str, Dict] = {}
+
+    def previous_key(path: str) -> Optional[str]:
+        entry = entries.get(document_id(path, tenant), {})
+        # Entries from before chunks carried metadata are re-read once to set it
+        return entry.get("ingest_key") if "tenant" in entry else None
+
+    def records() -> Iterator:
+        while True:
+            result = documents.get()
+            if result is _DONE:
+                return
+            doc_id = document_id(result["path"], tenant)
+            known_ids = set(entries.get(doc_id, {}).get("chunk_ids", []))
+            seen_ids: Dict[str, None] = {}
+            for chunk in result["chunks"]:
+                cid = chunk_id(chunk["text"], doc_id)
+                if cid in seen_ids:
+                    continue
+                seen_ids[cid] = None
+                metadata = pdf_pipeline.chunk_metadata(chunk, doc_id, result["path"], tenant, ingested_at)
+                if cid in known_ids:
+                    moved[cid] = metadata
+                else:
+                    summary["embedded"] += 1
+                    bm25_index.add([(cid, chunk["text"])])
+                    yield cid, chunk["text"], metadata
+            stale_ids.extend(known_ids.difference(seen_ids))
+            entries[doc_id] = {"source": result["path"], "tenant": tenant, "ingest_key": result["ingest_key"],
+                               "chunk_ids": list(seen_ids)}
+            summary["chunks"] += len(seen_ids)
+            summary["ingested"] += 1
+
+    def embed_and_store():
+        try:
+            load_stats.update(bulk_load(collection, records(), embed_fn=embedder.encode, batch_size=batch_size,
+                                        max_batch_size=resolve_max_batch_size(client),
+                                        span=pdf_pipeline.telemetry.span))
+        except Exception as e:
+            load_errors.append(e)
+            # Keep draining so the producer never blocks on a full queue
+            while documents.get() is not _DONE:
+                pass
+
+    embed_thread = threading.Thread(target=embed_and_store, name="batch-ingest-embedder", daemon=True)
+    embed_thread.start()
+
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Only a few documents are in flight at once, so finished results cannot pile up
+            # while the embedding thread is busy
+            max_in_flight = 2 * (workers or os.cpu_count() or 1)
+            remaining = iter(pdf_paths)
+            in_flight = {}
+
+            def submit_next():
+                path = next(remaining, None)
+                if path is not None:
+                    in_flight[executor.submit(extract_document, path, chunker_params, previous_key(path))] = path
+
+            for _ in range(max_in_flight):
+                submit_next()
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = in_flight.pop(future)
+                    submit_next()
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        summary["failed"] += 1
+                        print(f"Error: {path}: {str(e)}")
+                        continue
+                    if result["unchanged"]:
+                        summary["unchanged"] += 1
+                    else:
+                        documents.put(result)
+    finally:
+        documents.put(_DONE)
+        embed_thread.join()
+
+    if load_errors:
+        raise ValueError(f"Error storing chunks in ChromaDB: {str(load_errors[0])}")
+
+    pdf_pipeline.update_metadata(collection, moved, resolve_max_batch_size(client))
+    if stale_ids:
+        collection.delete(ids=stale_ids)
+        bm25_index.remove(stale_ids)
+    bm25_index.save()
+    summary["removed"] = len(stale_ids)
+    save_manifest(persist_dir, manifest)
+
+    summary["seconds"] = time.perf_counter() - start
+    pdf_pipeline.telemetry.incr("chunks_embedded", summary["embedded"])
+    pdf_pipeline.telemetry.incr("chunks_removed", summary["removed"])
+    summary["chunks_per_second"] = load_stats.get("docs_per_second", 0.0)
+    return summary
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="pdf_chat.py ingest",
+                                     description="Ingest every PDF under the given directories or glob patterns.")
+    parser.add_argument("paths", nargs="+", help="Directories, PDF files or glob patterns (e.g. 'library/**/*.pdf')")
+    parser.add_argument("--collection", help="ChromaDB collection name", default="pdf_chunks")
+    parser.add_argument("--persist-dir", help="ChromaDB storage directory", default="./chroma_db")
+    parser.add_argument("--workers", type=int, default=None, help="Extraction processes (default: all cores)")
+    parser.add_argument("--queue-size", type=int, default=8, help="Extracted documents buffered for embedding")
+    parser.add_argument("--batch-size", type=int, default=256, help="Chunks per embedding/write batch")
+    parser.add_argument("--embedding-cache", help="Directory for cached embeddings (empty to disable)",
+                        default="./embedding_cache")
+    parser.add_argument("--embedding-backend", choices=BACKENDS, default=None,
+                        help="Embedding runtime: torch, onnx or int8 (quantized ONNX)")
+    parser.add_argument("--tenant", help="Tenant recorded on every chunk (default: 'default')")
+    parser.add_argument("--shard-by-tenant", action="store_true",
+                        help="Store the tenant's chunks in its own collection instead of the shared one")
+    args = parser.parse_args(argv)
+
+    try:
+        pdf_paths = expand_pdf_paths(args.paths)
+        if not pdf_paths:
+            raise ValueError("No PDF files matched the given paths.")
+
+        if args.embedding_backend:
+            set_default_backend(args.embedding_backend)
+        if args.embedding_cache:
+            embedder = pdf_pipeline.get_embedding_service()
+            embedder.attach_cache(EmbeddingCache(args.embedding_cache, embedder.cache_name))
+
+        collection_name, _ = pdf_pipeline.tenant_scope(args.collection, args.tenant, args.shard_by_tenant)
+        print(f"Ingesting {len(pdf_paths)} PDF files into '{collection_name}'...")
+        summary = ingest_paths(pdf_paths, collection_name, args.persist_dir, args.workers,
+                               args.queue_size, args.batch_size, tenant=args.tenant)
+        print(f"Done in {summary['seconds']:.1f}s: {summary['ingested']} ingested, {summary['unchanged']} unchanged, "
+              f"{summary['failed']} failed; {summary['embedded']} chunks embedded at "
+              f"{summary['chunks_per_second']:.1f} chunks/s, {summary['removed']} removed.")
+
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {str(e)}")
+    except Exception as e:
+        print(f"Unexpected Error: {str(e)}")
+
+
+if __name__ == "__main__":
+    main()
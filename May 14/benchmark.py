@@ -0,0 +1,289 @@
+# Offline end-to-end benchmark for the pdf_chat pipeline. Gemini is replaced by a
+# local stub, so runs need no API key and measure only this repo's code paths.
+#
+#     python benchmark.py run --synthetic-pages 200 1000 --output before.json
+#     python benchmark.py compare before.json after.json --tolerance 0.10
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import pdf_pipeline
+from chromadb_setup import iter_documents
+from context_packer import pack_context
+from embedding_service import BACKENDS, EmbeddingService
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+_WORDS = ("river green pink town official name surprise morning council water report science "
+          "chemical color flow bridge fisherman mayor code meeting season evidence sample").split()
+
+
+class StubLLM:
+    """Offline stand-in for Gemini: answers with the first sentence of the context after an optional delay."""
+
+    def __init__(self, seconds_per_call: float = 0.0):
+        self.seconds_per_call = seconds_per_call
+
+    def generate(self, prompt: str) -> str:
+        if self.seconds_per_call:
+            time.sleep(self.seconds_per_call)
+        context = prompt.split("Context:\n", 1)[-1]
+        return context.split(". ", 1)[0][:200]
+
+
+def peak_rss_mb() -> float:
+    """High-water RSS of the whole process so far (it never goes down and survives exec)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def make_synthetic_pdf(path: str, pages: int, seed: int = 0):
+    """Writes a PDF with `pages` pages of pseudo-random paragraphs."""
+    import fitz
+
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for page_number in range(pages):
+        paragraphs = []
+        for _ in range(6):
+            sentences = [
+                " ".join(rng.choice(_WORDS) for _ in range(rng.randint(8, 16))).capitalize() + "."
+                for _ in range(rng.randint(2, 5))
+            ]
+            paragraphs.append(" ".join(sentences))
+        paragraphs.append(f"Reference code P-{page_number:04d} appears on page {page_number + 1}.")
+        page = doc.new_page()
+        page.insert_textbox(page.rect + (36, 36, -36, -36), "\n\n".join(paragraphs), fontsize=9)
+    doc.save(path)
+    doc.close()
+
+
+class StageTimer:
+    """Collects stage timings and how far each stage raised the process's peak RSS.
+
+    The growth is measured against the peak at the previous record() (or at creation),
+    so memory used by earlier stages or earlier PDFs is not charged to this one. A stage
+    that stays below an earlier peak reports 0.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, Dict] = {}
+        self.start_peak_mb = peak_rss_mb()
+        self._mark_mb = self.start_peak_mb
+
+    def record(self, name: str, seconds: float, items: int, unit: str):
+        peak = peak_rss_mb()
+        self.stages[name] = {
+            "seconds": seconds,
+            "items": items,
+            "unit": unit,
+            "per_second": items / seconds if seconds > 0 else 0.0,
+            "peak_rss_growth_mb": peak - self._mark_mb,
+        }
+        self._mark_mb = peak
+
+
+def _stage_seconds(stage: str) -> float:
+    """Total seconds recorded so far in pdf_pipeline's stage_seconds histogram for one stage."""
+    histogram = pdf_pipeline.telemetry.snapshot()["histograms"].get(("stage_seconds", (("stage", stage),)))
+    return histogram[1] if histogram else 0.0
+
+
+# Stages inside ingest_pdf; extraction and chunking run lazily inside the embedding
+# loop and the upserts run on a writer thread, so these overlap and need not sum to ingest
+INGEST_STAGES = ("extract_chunk", "embed", "chroma.upsert")
+
+
+def benchmark_pdf(pdf_path: str, queries: int, top_k: int, batch_size: int, llm: StubLLM,
+                  hybrid: bool = False, seed: int = 0, embedding_backend: str = "torch") -> Dict:
+    """Runs pdf_pipeline's ingest, retrieval and prompt building on one PDF with stage timings.
+
+    Ingest goes through pdf_pipeline.ingest_pdf into a temporary persist dir, so chunk
+    metadata, manifest bookkeeping, BM25 indexing and the bulk writer are all measured.
+    """
+    import fitz
+
+    with fitz.open(pdf_path) as doc:
+        pages = doc.page_count
+    timer = StageTimer()
+
+    # A fresh service without an embedding cache so every run pays the same model cost
+    embedder = EmbeddingService(backend=embedding_backend, batch_size=batch_size)
+    start = time.perf_counter()
+    _ = embedder.model
+    timer.record("model_load", time.perf_counter() - start, 1, "models")
+
+    persist_dir = tempfile.mkdtemp(prefix="rag_bench_")
+    try:
+        before = {stage: _stage_seconds(stage) for stage in INGEST_STAGES}
+        start = time.perf_counter()
+        collection, summary = pdf_pipeline.ingest_pdf(pdf_path, "benchmark", persist_dir, embedder=embedder)
+        timer.record("ingest", time.perf_counter() - start, summary["chunks"], "chunks")
+        timer.stages["ingest"]["breakdown_seconds"] = {
+            stage: _stage_seconds(stage) - before[stage] for stage in INGEST_STAGES
+        }
+
+        bm25_index = pdf_pipeline.load_bm25_index(collection, persist_dir) if hybrid else None
+
+        # Queries are word windows sampled from the stored chunks so every query has a true match
+        chunks = [record["document"] for record in iter_documents(collection, include=("documents",))]
+        rng = random.Random(seed)
+        query_texts = []
+        for _ in range(queries):
+            words = rng.choice(chunks).split()
+            offset = rng.randint(0, max(0, len(words) - 8))
+            query_texts.append(" ".join(words[offset:offset + 8]))
+
+        retrieve_latencies, generate_latencies, total_latencies = [], [], []
+        for query in query_texts:
+            start = time.perf_counter()
+            _, context, _ = pdf_pipeline.retrieve_chunks_with_ids(query, collection, top_k, bm25_index,
+                                                                  embedder=embedder)
+            retrieved = time.perf_counter()
+            packed = pack_context(query, context)
+            llm.generate(pdf_pipeline._build_prompt(query, packed))
+            done = time.perf_counter()
+            retrieve_latencies.append(retrieved - start)
+            generate_latencies.append(done - retrieved)
+            total_latencies.append(done - start)
+
+        # Retrieval and generation share one loop; its peak RSS growth is reported under retrieve
+        timer.record("retrieve", sum(retrieve_latencies), len(query_texts), "queries")
+        timer.record("generate", sum(generate_latencies), len(query_texts), "queries")
+    finally:
+        shutil.rmtree(persist_dir, ignore_errors=True)
+
+    latency_ms = {f"p{pct}": percentile(total_latencies, pct) * 1000 for pct in (50, 95, 99)}
+    return {
+        "pdf": os.path.basename(pdf_path),
+        "pages": pages,
+        "chunks": summary["chunks"],
+        "stages": timer.stages,
+        "query_latency_ms": latency_ms,
+        # How far this PDF raised the peak, and the process-lifetime peak (which includes earlier PDFs)
+        "peak_rss_growth_mb": peak_rss_mb() - timer.start_peak_mb,
+        "process_peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run(args) -> Dict:
+    llm = StubLLM(args.llm_delay)
+    pdfs = [os.path.abspath(path) for path in args.pdf]
+    workdir = tempfile.mkdtemp(prefix="rag_bench_pdfs_")
+    try:
+        for pages in args.synthetic_pages:
+            path = os.path.join(workdir, f"synthetic_{pages}p.pdf")
+            make_synthetic_pdf(path, pages)
+            pdfs.append(path)
+
+        results = []
+        for pdf_path in pdfs:
+            print(f"Benchmarking {os.path.basename(pdf_path)}...", file=sys.stderr)
+            results.append(benchmark_pdf(pdf_path, args.queries, args.top_k, args.batch_size, llm, args.hybrid,
+                                         embedding_backend=args.embedding_backend))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "settings": {"queries": args.queries, "top_k": args.top_k, "batch_size": args.batch_size,
+                     "hybrid": args.hybrid, "llm_delay": args.llm_delay,
+                     "embedding_backend": args.embedding_backend},
+        "runs": results,
+    }
+
+
+def compare(baseline: Dict, current: Dict, tolerance: float) -> List[str]:
+    """Returns a line per metric that got slower than baseline by more than tolerance."""
+    regressions = []
+    baseline_runs = {run["pdf"]: run for run in baseline["runs"]}
+    for run in current["runs"]:
+        base = baseline_runs.get(run["pdf"])
+        if base is None:
+            continue
+        metrics: Dict[str, tuple] = {}
+        for stage, values in run["stages"].items():
+            if stage in base["stages"]:
+                metrics[f"{stage} seconds"] = (base["stages"][stage]["seconds"], values["seconds"])
+        for pct, value in run["query_latency_ms"].items():
+            metrics[f"query {pct} ms"] = (base["query_latency_ms"][pct], value)
+        # Result files written before per-run RSS growth was recorded have no comparable value
+        if "peak_rss_growth_mb" in base:
+            metrics["peak RSS growth MB"] = (base["peak_rss_growth_mb"], run["peak_rss_growth_mb"])
+
+        for name, (old, new) in metrics.items():
+            change = (new - old) / old if old > 0 else 0.0
+            marker = "REGRESSION" if change > tolerance else "ok"
+            line = f"{run['pdf']:<28} {name:<22} {old:>10.3f} -> {new:>10.3f} ({change:+.1%}) {marker}"
+            print(line)
+            if change > tolerance:
+                regressions.append(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end RAG benchmark with stage-level timings.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmark and print JSON results")
+    run_parser.add_argument("--pdf", nargs="*", default=[os.path.join(HERE, "Book_sample.pdf")],
+                            help="PDF files to benchmark (default: Book_sample.pdf)")
+    run_parser.add_argument("--synthetic-pages", type=int, nargs="*", default=[200],
+                            help="Also generate synthetic PDFs with these page counts")
+    run_parser.add_argument("--queries", type=int, default=50, help="Queries per PDF")
+    run_parser.add_argument("--top-k", type=int, default=3)
+    run_parser.add_argument("--batch-size", type=int, default=64, help="Chunks per embedding model call")
+    run_parser.add_argument("--hybrid", action="store_true", help="Include BM25 indexing and hybrid retrieval")
+    run_parser.add_argument("--embedding-backend", choices=BACKENDS, default="torch")
+    run_parser.add_argument("--llm-delay", type=float, default=0.0, help="Seconds the stub LLM sleeps per call")
+    run_parser.add_argument("--output", help="Write results to this JSON file as well as stdout")
+
+    compare_parser = commands.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--tolerance", type=float, default=0.10,
+                                help="Allowed slowdown before a metric counts as a regression (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        results = run(args)
+        output = json.dumps(results, indent=2)
+        print(output)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(output + "\n")
+    else:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        with open(args.current, "r", encoding="utf-8") as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.tolerance:.0%}.")
+            sys.exit(1)
+        print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# Retrieval-quality parity check for the embedding backends: encodes the chunks of a
+# PDF with a reference backend (torch) and a candidate backend, then compares vector
+# similarity and top-k retrieval overlap. Exits with status 1 if either falls below
+# its tolerance.
+#
+#     python check_embedding_parity.py --backend int8 --pdf Book_sample.pdf
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+import pdf_pipeline
+from embedding_service import BACKENDS, EmbeddingService
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def sample_queries(chunks, count: int, seed: int = 0, words: int = 8):
+    """Word windows drawn from the chunks, so every query has a relevant passage."""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        tokens = rng.choice(chunks).split()
+        offset = rng.randint(0, max(0, len(tokens) - words))
+        queries.append(" ".join(tokens[offset:offset + words]))
+    return queries
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def encode_timed(service: EmbeddingService, texts):
+    _ = service.model
+    start = time.perf_counter()
+    vectors = service.encode(texts)
+    return normalize(vectors), time.perf_counter() - start
+
+
+def top_k(query_vectors: np.ndarray, chunk_vectors: np.ndarray, k: int) -> np.ndarray:
+    scores = query_vectors @ chunk_vectors.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that an embedding backend matches PyTorch retrieval quality.")
+    parser.add_argument("--backend", choices=BACKENDS, default="int8", help="Backend to check")
+    parser.add_argument("--reference", choices=BACKENDS, default="torch", help="Backend to compare against")
+    parser.add_argument("--pdf", default=os.path.join(HERE, "Book_sample.pdf"), help="PDF providing the corpus")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--min-cosine", type=float, default=0.98,
+                        help="Minimum mean cosine similarity between reference and candidate vectors")
+    parser.add_argument("--min-recall", type=float, default=0.9,
+                        help="Minimum fraction of the reference top-k the candidate also returns")
+    args = parser.parse_args()
+
+    chunks = list(pdf_pipeline.iter_pdf_chunks(args.pdf, max_tokens=256, min_chunk_size=25))
+    if len(chunks) <= args.top_k:
+        print(f"FAIL: {args.pdf} yields only {len(chunks)} chunks; need more than --top-k.")
+        sys.exit(1)
+    queries = sample_queries(chunks, args.queries)
+
+    reference = EmbeddingService(backend=args.reference)
+    candidate = EmbeddingService(backend=args.backend)
+    ref_chunks, ref_seconds = encode_timed(reference, chunks)
+    cand_chunks, cand_seconds = encode_timed(candidate, chunks)
+    ref_queries, _ = encode_timed(reference, queries)
+    cand_queries, _ = encode_timed(candidate, queries)
+
+    cosine = np.sum(ref_chunks * cand_chunks, axis=1)
+    ref_top = top_k(ref_queries, ref_chunks, args.top_k)
+    cand_top = top_k(cand_queries, cand_chunks, args.top_k)
+    recall = np.mean([len(set(r).intersection(c)) / args.top_k for r, c in zip(ref_top, cand_top)])
+    top1 = np.mean(ref_top[:, 0] == cand_top[:, 0])
+
+    print(f"{len(chunks)} chunks, {len(queries)} queries, {args.reference} vs {args.backend}")
+    print(f"Cosine similarity: mean {cosine.mean():.4f}, min {cosine.min():.4f}")
+    print(f"Recall@{args.top_k}: {recall:.3f}, top-1 agreement: {top1:.3f}")
+    print(f"Chunk encoding: {args.reference} {ref_seconds:.2f}s, {args.backend} {cand_seconds:.2f}s "
+          f"({ref_seconds / cand_seconds if cand_seconds > 0 else 0.0:.1f}x)")
+
+    failures = []
+    if cosine.mean() < args.min_cosine:
+        failures.append(f"mean cosine {cosine.mean():.4f} is below {args.min_cosine}")
+    if recall < args.min_recall:
+        failures.append(f"recall@{args.top_k} {recall:.3f} is below {args.min_recall}")
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print(f"OK: {args.backend} retrieval is within tolerance of {args.reference}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# Import-time budget check for pdf_chat.py: exits with status 1 if importing
+# pdf_chat pulls in a heavy dependency, `pdf_chat.py --help` exceeds the budget,
+# answering a query loads PyMuPDF, or ingesting a PDF loads the Gemini SDK.
+#
+#     python check_startup.py --budget 1.0
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Each of these belongs to exactly one stage and must not load at import time
+HEAVY_MODULES = {
+    "fitz": "PyMuPDF (extraction)",
+    "chromadb": "ChromaDB (storage/retrieval)",
+    "sentence_transformers": "SentenceTransformers (embedding)",
+    "torch": "PyTorch (embedding)",
+    "google.generativeai": "Gemini SDK (generation)",
+    "gemini_client": "Gemini client wrapper (generation)",
+}
+
+_PROBE = """
+import json, sys
+import pdf_chat
+print(json.dumps(sorted(sys.modules)))
+"""
+
+# The stage probes replace the embedding model with a fake so they need no model
+# download; modules are checked by name, so the fake's own entry does not matter
+_FAKE_MODEL = """
+import sys, types
+import numpy as np
+
+class SentenceTransformer:
+    def __init__(self, model_name, **kwargs):
+        pass
+
+    def get_sentence_embedding_dimension(self):
+        return 8
+
+    def encode(self, texts, **kwargs):
+        return np.ones((len(texts), 8), dtype=np.float32)
+
+sys.modules["sentence_transformers"] = types.SimpleNamespace(SentenceTransformer=SentenceTransformer)
+"""
+
+# Query and answer against an in-memory collection with a stubbed Gemini client
+_QUERY_PROBE = _FAKE_MODEL + """
+import json
+
+class GoogleAPIError(Exception):
+    pass
+
+class StubGeminiClient:
+    def generate_sync(self, prompt, model_name):
+        return "stub answer"
+
+    def stream_sync(self, prompt, model_name):
+        yield "stub answer"
+
+sys.modules["google.api_core.exceptions"] = types.SimpleNamespace(GoogleAPIError=GoogleAPIError)
+sys.modules["gemini_client"] = types.SimpleNamespace(get_gemini_client=lambda api_key, on_retry=None: StubGeminiClient())
+
+class StubCollection:
+    name = "startup_probe"
+
+    def query(self, query_embeddings, n_results, where=None):
+        return {"ids": [["chunk-1"]], "documents": [["The river turned pink after the chemical spill."]]}
+
+import pdf_pipeline
+pdf_pipeline.answer_query("Why is the river pink?", StubCollection(), "probe-key")
+"".join(pdf_pipeline.stream_answer("Why is the river pink?", StubCollection(), "probe-key"))
+print(json.dumps(sorted(sys.modules)))
+"""
+
+# Ingest the sample PDF into a throwaway Chroma directory (needs PyMuPDF and chromadb)
+_INGEST_PROBE = _FAKE_MODEL + """
+import json, shutil, tempfile
+import pdf_pipeline
+
+persist_dir = tempfile.mkdtemp(prefix="startup_probe_")
+try:
+    pdf_pipeline.ingest_pdf("Book_sample.pdf", "startup_probe", persist_dir)
+finally:
+    shutil.rmtree(persist_dir, ignore_errors=True)
+print(json.dumps(sorted(sys.modules)))
+"""
+
+# Modules each stage must leave unloaded, so query-only and ingest-only runs stay light
+STAGE_PROBES = {
+    "answering a query": (_QUERY_PROBE, ("fitz",)),
+    "ingesting a PDF": (_INGEST_PROBE, ("google.generativeai", "gemini_client")),
+}
+
+
+def imported_modules(probe: str = _PROBE):
+    """Returns the set of modules loaded by running a probe script (default: a fresh `import pdf_chat`)."""
+    output = subprocess.run([sys.executable, "-c", probe], cwd=HERE, check=True,
+                            capture_output=True, text=True).stdout
+    return set(json.loads(output.strip().splitlines()[-1]))
+
+
+def help_seconds() -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "pdf_chat.py", "--help"], cwd=HERE, check=True,
+                   capture_output=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that pdf_chat.py starts quickly.")
+    parser.add_argument("--budget", type=float, default=1.0, help="Maximum seconds for `pdf_chat.py --help`")
+    args = parser.parse_args()
+
+    failures = []
+    modules = imported_modules()
+    for module, label in HEAVY_MODULES.items():
+        if module in modules:
+            failures.append(f"`import pdf_chat` loaded {module} ({label})")
+
+    for stage, (probe, forbidden) in STAGE_PROBES.items():
+        try:
+            modules = imported_modules(probe)
+        except subprocess.CalledProcessError as e:
+            last_line = (e.stderr.strip().splitlines() or ["no output"])[-1]
+            failures.append(f"the {stage} probe failed: {last_line}")
+            continue
+        for module in forbidden:
+            if module in modules:
+                failures.append(f"{stage} loaded {module} ({HEAVY_MODULES[module]})")
+
+    elapsed = help_seconds()
+    print(f"pdf_chat.py --help: {elapsed:.2f}s (budget {args.budget:.2f}s)")
+    if elapsed > args.budget:
+        failures.append(f"--help took {elapsed:.2f}s, over the {args.budget:.2f}s budget")
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print("OK: no heavy dependencies imported at startup or by the wrong stage.")
+
+
+if __name__ == "__main__":
+    main()
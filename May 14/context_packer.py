@@ -0,0 +1,95 @@
+import os
+import re
+import sys
+import zlib
+from typing import Callable, List, Optional, Sequence
+
+# The chunker lives in the May 13 folder; make it importable when this module is used on its own
+_MAY_13 = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "May 13")
+if _MAY_13 not in sys.path:
+    sys.path.append(_MAY_13)
+
+from hybrid_search import tokenize
+# The chunker's estimate, so chunk sizes and context budgets agree
+from text_chunker import estimate_tokens
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = text.lower().split()
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash_signature(text: str, num_perm: int = 64) -> List[int]:
+    """MinHash signature over word 3-shingles; the fraction of equal slots estimates Jaccard similarity."""
+    hashes = [zlib.crc32(shingle.encode("utf-8")) for shingle in _shingles(text)]
+    if not hashes:
+        return [0] * num_perm
+    # Deterministic (a * h + b) mod p permutations
+    return [
+        min(((2 * i + 1) * 0x9E3779B1 * h + i * 0x85EBCA77) % _MERSENNE_PRIME for h in hashes)
+        for i in range(num_perm)
+    ]
+
+
+def estimated_jaccard(sig_a: Sequence[int], sig_b: Sequence[int]) -> float:
+    return sum(a == b for a, b in zip(sig_a, sig_b)) / len(sig_a)
+
+
+def trim_to_relevant_sentences(query: str, text: str, token_budget: float,
+                               count_tokens: Callable[[str], float]) -> str:
+    """Keeps the sentences sharing the most terms with the query that fit the budget, in original order."""
+    sentences = [s for s in _SENTENCE_END.split(text) if s.strip()]
+    query_terms = set(tokenize(query))
+    overlap = [len(query_terms.intersection(tokenize(sentence))) for sentence in sentences]
+    ranked = sorted(range(len(sentences)), key=lambda i: (overlap[i], -i), reverse=True)
+    # Sentences with no query terms only pad the prompt, unless nothing matches at all
+    if any(overlap):
+        ranked = [i for i in ranked if overlap[i]]
+    kept, used = [], 0.0
+    for i in ranked:
+        cost = count_tokens(sentences[i])
+        if used + cost <= token_budget:
+            kept.append(i)
+            used += cost
+    return " ".join(sentences[i] for i in sorted(kept))
+
+
+def pack_context(query: str, chunks: Sequence[str], token_budget: int = 1200,
+                 token_counter: Optional[Callable[[str], float]] = None,
+                 duplicate_threshold: float = 0.8, min_trimmed_tokens: int = 20) -> List[str]:
+    """Selects context for the prompt from chunks ordered best first.
+
+    Chunks whose estimated Jaccard similarity with an already selected chunk reaches
+    duplicate_threshold are dropped (overlap windows and repeated passages). Chunks
+    are added whole while they fit token_budget; the first one that does not fit is
+    trimmed to its most query-relevant sentences, and packing stops there.
+    """
+    count_tokens = token_counter or estimate_tokens
+    selected: List[str] = []
+    signatures: List[List[int]] = []
+    remaining = float(token_budget)
+
+    for chunk in chunks:
+        signature = minhash_signature(chunk)
+        if any(estimated_jaccard(signature, other) >= duplicate_threshold for other in signatures):
+            continue
+
+        cost = count_tokens(chunk)
+        if cost <= remaining:
+            selected.append(chunk)
+            signatures.append(signature)
+            remaining -= cost
+            continue
+
+        if remaining >= min_trimmed_tokens:
+            trimmed = trim_to_relevant_sentences(query, chunk, remaining, count_tokens)
+            if trimmed:
+                selected.append(trimmed)
+        break
+
+    return selected
@@ -0,0 +1,181 @@
+import atexit
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache keyed by (model name, text hash).
+
+    The memory tier is an LRU of at most memory_items vectors. The disk tier is a
+    memory-mapped float32 array (one row per text) plus a JSON index mapping text
+    hashes to rows; once max_disk_items rows are used, the least recently used
+    rows are reused.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str, memory_items: int = 10000,
+                 max_disk_items: int = 200000, flush_every: int = 1024):
+        self.cache_dir = cache_dir
+        self.model_name = model_name
+        self.memory_items = memory_items
+        self.max_disk_items = max_disk_items
+        self.flush_every = flush_every
+        self.hits = 0
+        self.misses = 0
+
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self._vectors_path = os.path.join(cache_dir, f"{safe_name}.f32")
+        self._index_path = os.path.join(cache_dir, f"{safe_name}.index.json")
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._index: Dict[str, List[int]] = {}  # text hash -> [row, last used tick]
+        self._free_rows: List[int] = []
+        self._tick = 0
+        self._dimension: Optional[int] = None
+        self._rows = 0
+        self._vectors: Optional[np.memmap] = None
+        self._unflushed = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+        atexit.register(self.flush)
+
+    def _load_index(self):
+        if not (os.path.isfile(self._index_path) and os.path.isfile(self._vectors_path)):
+            return
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._dimension = data["dimension"]
+            self._rows = data["rows"]
+            self._tick = data["tick"]
+            self._index = data["entries"]
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+",
+                                      shape=(self._rows, self._dimension))
+        except (OSError, ValueError, KeyError):
+            # An unreadable cache is simply started over
+            self._index, self._rows, self._dimension, self._vectors = {}, 0, None, None
+            return
+        used = {row for row, _ in self._index.values()}
+        self._free_rows = [row for row in range(self._rows) if row not in used]
+
+    def _grow(self, needed: int):
+        # Doubles the backing file until it holds `needed` rows or hits max_disk_items
+        new_rows = max(self._rows, 1024)
+        while new_rows < needed and new_rows < self.max_disk_items:
+            new_rows *= 2
+        new_rows = min(new_rows, self.max_disk_items)
+        if new_rows <= self._rows:
+            return
+        if self._vectors is not None:
+            self._vectors.flush()
+        mode = "r+" if os.path.isfile(self._vectors_path) and self._rows else "w+"
+        if mode == "r+":
+            with open(self._vectors_path, "r+b") as f:
+                f.truncate(new_rows * self._dimension * 4)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode=mode,
+                                  shape=(new_rows, self._dimension))
+        self._free_rows.extend(range(self._rows, new_rows))
+        self._rows = new_rows
+
+    def _evict_disk(self, count: int):
+        # Frees the `count` least recently used rows
+        oldest = sorted(self._index.items(), key=lambda item: item[1][1])[:count]
+        for key, (row, _) in oldest:
+            del self._index[key]
+            self._free_rows.append(row)
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Returns a cached vector or None for each text."""
+        results: List[Optional[np.ndarray]] = []
+        with self._lock:
+            for text in texts:
+                key = text_hash(text)
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                else:
+                    entry = self._index.get(key)
+                    if entry is not None and self._vectors is not None:
+                        self._tick += 1
+                        entry[1] = self._tick
+                        vector = np.array(self._vectors[entry[0]])
+                        self._remember(key, vector)
+                if vector is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                results.append(vector)
+        return results
+
+    def put_many(self, texts: Sequence[str], vectors: np.ndarray):
+        """Stores vectors for texts in both tiers."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(texts):
+            return
+        with self._lock:
+            if self._dimension is None:
+                self._dimension = int(vectors.shape[1])
+            elif vectors.shape[1] != self._dimension:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match cache dimension {self._dimension}.")
+
+            new_keys: Dict[str, np.ndarray] = {}
+            for text, vector in zip(texts, vectors):
+                key = text_hash(text)
+                self._remember(key, vector)
+                if key not in self._index:
+                    new_keys[key] = vector
+
+            shortfall = len(new_keys) - len(self._free_rows)
+            if shortfall > 0:
+                self._grow(len(self._index) + len(new_keys))
+                shortfall = len(new_keys) - len(self._free_rows)
+            if shortfall > 0:
+                # Evict a little extra so the next put does not immediately evict again
+                self._evict_disk(min(len(self._index), max(shortfall, self._rows // 10)))
+
+            for key, vector in list(new_keys.items())[-self._rows:] if self._rows else []:
+                row = self._free_rows.pop()
+                self._vectors[row] = vector
+                self._tick += 1
+                self._index[key] = [row, self._tick]
+
+            self._unflushed += len(new_keys)
+            if self._unflushed >= self.flush_every:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if self._vectors is None:
+            return
+        self._vectors.flush()
+        tmp_path = self._index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"model_name": self.model_name, "dimension": self._dimension, "rows": self._rows,
+                       "tick": self._tick, "entries": self._index}, f)
+        os.replace(tmp_path, self._index_path)
+        self._unflushed = 0
+
+    def flush(self):
+        """Persists the memory-mapped vectors and the index."""
+        with self._lock:
+            self._flush_locked()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses,
+                "memory_items": len(self._memory), "disk_items": len(self._index)}
@@ -0,0 +1,211 @@
+import os
+import platform
+import threading
+import queue
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from telemetry import get_telemetry
+
+DEFAULT_MODEL_NAME = "all-MiniLM-L6-v2"
+
+# "torch" is full-precision PyTorch; "onnx" runs the same weights on ONNX Runtime;
+# "int8" runs the dynamically quantized ONNX export
+BACKENDS = ("torch", "onnx", "int8")
+_default_backend = os.environ.get("PDF_CHAT_EMBEDDING_BACKEND", "torch")
+
+
+def set_default_backend(backend: str):
+    """Selects the backend used by get_embedding_service() when none is given."""
+    global _default_backend
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}'; choose one of {', '.join(BACKENDS)}.")
+    _default_backend = backend
+
+
+def _quantized_onnx_file() -> str:
+    # all-MiniLM-L6-v2 (like most sentence-transformers models) ships int8 exports per instruction set
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "onnx/model_qint8_arm64.onnx"
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as f:
+            flags = f.read()
+    except OSError:
+        flags = ""
+    if "avx512_vnni" in flags:
+        return "onnx/model_qint8_avx512_vnni.onnx"
+    if "avx512" in flags:
+        return "onnx/model_qint8_avx512.onnx"
+    return "onnx/model_quint8_avx2.onnx"
+
+
+def load_model(model_name: str, backend: str = "torch"):
+    """Loads a SentenceTransformer on the given backend; all backends share the encode() API."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}'; choose one of {', '.join(BACKENDS)}.")
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+    kwargs = {"backend": "onnx"}
+    if backend == "int8":
+        kwargs["model_kwargs"] = {"file_name": _quantized_onnx_file()}
+    try:
+        return SentenceTransformer(model_name, **kwargs)
+    except (ImportError, TypeError) as e:
+        # TypeError: sentence-transformers older than 3.2 has no backend argument
+        raise ValueError(f"The '{backend}' embedding backend needs sentence-transformers>=3.2 with ONNX Runtime "
+                         f"(pip install 'sentence-transformers[onnx]'): {str(e)}")
+
+
+class EmbeddingService:
+    """Shared SentenceTransformer wrapper that loads the model once and encodes in batches."""
+
+    def __init__(self, model_name: str = DEFAULT_MODEL_NAME, batch_size: int = 64,
+                 sort_by_length: bool = True, max_queue_wait: float = 0.01, backend: Optional[str] = None):
+        self.model_name = model_name
+        self.backend = backend or _default_backend
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown embedding backend '{self.backend}'; choose one of {', '.join(BACKENDS)}.")
+        self.batch_size = batch_size
+        self.sort_by_length = sort_by_length
+        self.max_queue_wait = max_queue_wait
+        self.cache = None
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._encode_lock = threading.Lock()
+        self._requests: "queue.Queue" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+
+    @property
+    def model(self):
+        """Loads the model on first use and returns the cached instance afterwards."""
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = load_model(self.model_name, self.backend)
+        return self._model
+
+    @property
+    def cache_name(self) -> str:
+        """Name for cached vectors; backends produce slightly different vectors, so each gets its own."""
+        return self.model_name if self.backend == "torch" else f"{self.model_name}-{self.backend}"
+
+    @property
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def attach_cache(self, cache):
+        """Routes encode() through an EmbeddingCache so known texts skip the model."""
+        self.cache = cache
+
+    def encode(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """Encodes texts, serving cached vectors when a cache is attached."""
+        if self.cache is None or not texts:
+            return self._encode_uncached(texts, batch_size)
+
+        cached = self.cache.get_many(texts)
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        telemetry = get_telemetry()
+        telemetry.incr("embedding_cache_lookups", len(texts) - len(missing), result="hit")
+        telemetry.incr("embedding_cache_lookups", len(missing), result="miss")
+        if not missing:
+            return np.vstack(cached).astype(np.float32, copy=False)
+
+        fresh = self._encode_uncached([texts[i] for i in missing], batch_size)
+        self.cache.put_many([texts[i] for i in missing], fresh)
+        result = np.zeros((len(texts), fresh.shape[1]), dtype=np.float32)
+        for i, vector in enumerate(cached):
+            if vector is not None:
+                result[i] = vector
+        result[missing] = fresh
+        return result
+
+    def _encode_uncached(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """Encodes texts in batches, optionally sorted by length to reduce padding."""
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+
+        batch_size = batch_size or self.batch_size
+        order = list(range(len(texts)))
+        if self.sort_by_length:
+            order.sort(key=lambda i: len(texts[i]), reverse=True)
+
+        result = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        # The model is not safe to drive from several threads at once
+        with self._encode_lock:
+            for start in range(0, len(order), batch_size):
+                batch_idx = order[start:start + batch_size]
+                vectors = self.model.encode(
+                    [texts[i] for i in batch_idx],
+                    batch_size=batch_size,
+                    show_progress_bar=False,
+                    convert_to_numpy=True,
+                )
+                result[batch_idx] = vectors
+        return result
+
+    def submit(self, texts: List[str]) -> Future:
+        """Queues texts for encoding; concurrent requests are coalesced into shared batches."""
+        future: Future = Future()
+        self._ensure_worker()
+        self._requests.put((list(texts), future))
+        return future
+
+    def encode_queued(self, texts: List[str]) -> np.ndarray:
+        """Blocking helper around submit() for callers on worker threads."""
+        return self.submit(texts).result()
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._drain_requests, name="embedding-service", daemon=True
+                )
+                self._worker.start()
+
+    def _drain_requests(self):
+        while True:
+            pending = [self._requests.get()]
+            pending_texts = len(pending[0][0])
+            # Collect whatever else arrives within the wait window, up to one batch
+            while pending_texts < self.batch_size:
+                try:
+                    item = self._requests.get(timeout=self.max_queue_wait)
+                except queue.Empty:
+                    break
+                pending.append(item)
+                pending_texts += len(item[0])
+
+            all_texts = [text for texts, _ in pending for text in texts]
+            try:
+                vectors = self.encode(all_texts)
+            except Exception as e:
+                for _, future in pending:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for texts, future in pending:
+                future.set_result(vectors[offset:offset + len(texts)])
+                offset += len(texts)
+
+
+_services: Dict[Tuple[str, str], EmbeddingService] = {}
+_services_lock = threading.Lock()
+
+
+def get_embedding_service(model_name: str = DEFAULT_MODEL_NAME, backend: Optional[str] = None) -> EmbeddingService:
+    """Returns the process-wide embedding service for a model name and backend (default: see set_default_backend)."""
+    key = (model_name, backend or _default_backend)
+    with _services_lock:
+        service = _services.get(key)
+        if service is None:
+            service = EmbeddingService(model_name, backend=key[1])
+            _services[key] = service
+        return service
@@ -0,0 +1,150 @@
+import gzip
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Keeps codes, versions and numbers such as "A-113", "3.14" or "v2_final" as single terms
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-_/][a-z0-9]+)*")
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he her his i in is it its of on or "
+    "she that the their them they this to was were what when where which who will with you".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """Inverted index with BM25 scoring, stored as gzipped JSON next to a Chroma collection.
+
+    Chunks are numbered internally so postings stay small; removed chunks leave a
+    hole that is dropped the next time the index is saved.
+    """
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._ids: List[Optional[str]] = []
+        self._lengths: List[int] = []
+        self._numbers: Dict[str, int] = {}
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+        if os.path.isfile(path):
+            self._load()
+
+    def _load(self):
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            # A broken index is rebuilt as chunks are re-ingested
+            return
+        self._ids = data["ids"]
+        self._lengths = data["lengths"]
+        self._numbers = {cid: num for num, cid in enumerate(self._ids)}
+        self._postings = {term: {int(num): tf for num, tf in postings.items()}
+                          for term, postings in data["postings"].items()}
+        self._total_length = sum(self._lengths)
+
+    def save(self):
+        """Writes the index atomically, compacting out removed chunks."""
+        with self._lock:
+            live = [num for num, cid in enumerate(self._ids) if cid is not None]
+            renumber = {old: new for new, old in enumerate(live)}
+            data = {
+                "ids": [self._ids[num] for num in live],
+                "lengths": [self._lengths[num] for num in live],
+                "postings": {term: {renumber[num]: tf for num, tf in postings.items()}
+                             for term, postings in self._postings.items()},
+            }
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def add(self, records: Iterable[Tuple[str, str]]):
+        """Indexes (chunk_id, text) pairs; chunk IDs already present are skipped."""
+        with self._lock:
+            for cid, text in records:
+                if cid in self._numbers:
+                    continue
+                terms = Counter(tokenize(text))
+                num = len(self._ids)
+                self._ids.append(cid)
+                length = sum(terms.values())
+                self._lengths.append(length)
+                self._total_length += length
+                self._numbers[cid] = num
+                for term, tf in terms.items():
+                    self._postings.setdefault(term, {})[num] = tf
+
+    def remove(self, chunk_ids: Iterable[str]):
+        with self._lock:
+            nums = {self._numbers.pop(cid) for cid in chunk_ids if cid in self._numbers}
+            if not nums:
+                return
+            for num in nums:
+                self._ids[num] = None
+                self._total_length -= self._lengths[num]
+            for term in list(self._postings):
+                postings = self._postings[term]
+                for num in nums.intersection(postings):
+                    del postings[num]
+                if not postings:
+                    del self._postings[term]
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[str, float]]:
+        """Returns up to top_k (chunk_id, score) pairs, best first."""
+        with self._lock:
+            doc_count = len(self._numbers)
+            if not doc_count:
+                return []
+            avg_length = self._total_length / doc_count
+            scores: Dict[int, float] = {}
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                for num, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[num] / avg_length)
+                    scores[num] = scores.get(num, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+            best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+            return [(self._ids[num], score) for num, score in best]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Fuses several best-first ID rankings with RRF: score = sum of 1 / (k + rank)."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, cid in enumerate(ranking, 1):
+            scores[cid] = scores.get(cid, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+_indexes: Dict[str, BM25Index] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_bm25_index(persist_dir: str, collection_name: str) -> BM25Index:
+    """Returns the process-wide BM25 index stored under persist_dir/bm25 for a collection."""
+    path = os.path.join(persist_dir, "bm25", f"{collection_name}.json.gz")
+    with _indexes_lock:
+        index = _indexes.get(path)
+        if index is None:
+            index = BM25Index(path)
+            _indexes[path] = index
+        return index
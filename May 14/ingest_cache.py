@@ -0,0 +1,64 @@
+import hashlib
+import json
+import os
+from typing import Dict, Optional
+
+MANIFEST_FILENAME = "ingest_manifest.json"
+
+# Tenant recorded on chunks ingested without one
+DEFAULT_TENANT = "default"
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """Hashes a file's content without reading it into memory at once."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def compute_ingest_key(pdf_path: str, chunker_params: Dict) -> str:
+    """Key for an ingest run: the PDF content hash plus the chunker parameters."""
+    params = json.dumps(chunker_params, sort_keys=True, default=str)
+    return hashlib.sha256(f"{file_sha256(pdf_path)}\0{params}".encode("utf-8")).hexdigest()
+
+
+def document_id(pdf_path: str, tenant: Optional[str] = None) -> str:
+    """Stable ID for a source document, derived from its absolute path and namespaced by tenant when given.
+
+    The default tenant keeps the un-namespaced IDs of documents ingested before tenants existed.
+    """
+    source = os.path.abspath(pdf_path)
+    if tenant and tenant != DEFAULT_TENANT:
+        source = f"{tenant}\0{source}"
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()[:12]
+
+
+def chunk_id(chunk: str, doc_id: Optional[str] = None) -> str:
+    """Deterministic chunk ID from the chunk text, namespaced by document when given."""
+    chunk_hash = hashlib.sha256(chunk.encode("utf-8")).hexdigest()[:32]
+    return f"{doc_id}-{chunk_hash}" if doc_id else chunk_hash
+
+
+def load_manifest(persist_dir: str) -> Dict:
+    """Loads the ingest manifest ({collection: {doc_id: entry}}) stored next to the Chroma data."""
+    path = os.path.join(persist_dir, MANIFEST_FILENAME)
+    if not os.path.isfile(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # A corrupt manifest only costs a full re-ingest
+        return {}
+
+
+def save_manifest(persist_dir: str, manifest: Dict):
+    """Writes the manifest atomically so an interrupted run never leaves it half written."""
+    os.makedirs(persist_dir, exist_ok=True)
+    path = os.path.join(persist_dir, MANIFEST_FILENAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
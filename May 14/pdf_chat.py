@@ -1,143 +1,38 @@
-import fitz 
-import chromadb
-from sentence_transformers import SentenceTransformer
-import google.generativeai as genai
-from google.api_core.exceptions import GoogleAPIError
 import os
-import re
+import sys
+import json
 import argparse
-from typing import List
-import uuid
+import logging
+from typing import Dict, Optional
 
-def chunk_pdf_text(pdf_path: str, max_tokens: int = 512, min_chunk_size: int = 50) -> List[str]:
-    """Extracts and chunks text from a PDF using PyMuPDF."""
-    try:
-        doc = fitz.open(pdf_path)
-        if doc.page_count == 0:
-            doc.close()
-            raise ValueError("PDF is empty or contains no pages.")
-        
-        text = ""
-        for page in doc:
-            page_text = page.get_text("text") or ""
-            text += page_text + "\n\n"
-        
-        doc.close()
-        
-        if not text.strip():
-            raise ValueError("No text could be extracted from the PDF.")
-        
-        text = re.sub(r'\n\s*\n+', '\n\n', text.strip())
-        paragraphs = text.split('\n\n')
-        chunks = []
-        current_chunk = ""
-        current_token_count = 0
-        words_per_token = 0.75
-        
-        for para in paragraphs:
-            para = para.strip()
-            if not para:
-                continue
-                
-            word_count = len(para.split())
-            token_count = word_count / words_per_token
-            
-            if token_count > max_tokens:
-                words = para.split()
-                temp_chunk = ""
-                temp_token_count = 0
-                
-                for word in words:
-                    word_token_count = 1 / words_per_token
-                    if temp_token_count + word_token_count > max_tokens:
-                        if len(temp_chunk) >= min_chunk_size:
-                            chunks.append(temp_chunk.strip())
-                        temp_chunk = word
-                        temp_token_count = word_token_count
-                    else:
-                        temp_chunk += " " + word
-                        temp_token_count += word_token_count
-                
-                if len(temp_chunk.strip()) >= min_chunk_size:
-                    chunks.append(temp_chunk.strip())
-                continue
-            
-            if current_token_count + token_count > max_tokens:
-                if len(current_chunk) >= min_chunk_size:
-                    chunks.append(current_chunk.strip())
-                current_chunk = para
-                current_token_count = token_count
-            else:
-                current_chunk += "\n\n" + para if current_chunk else para
-                current_token_count += token_count
-        
-        if len(current_chunk.strip()) >= min_chunk_size:
-            chunks.append(current_chunk.strip())
-        
-        return chunks if chunks else ["No valid chunks created."]
-    
-    except FileNotFoundError:
-        raise FileNotFoundError(f"PDF file not found at: {pdf_path}")
-    except Exception as e:
-        raise ValueError(f"Error processing PDF: {str(e)}")
-
-def store_chunks_in_chromadb(chunks: List[str], collection_name: str, persist_dir: str = "./chroma_db"):
-    """Stores chunks in ChromaDB with embeddings."""
-    try:
-        client = chromadb.PersistentClient(path=persist_dir)
-        collection = client.get_or_create_collection(name=collection_name)
-        
-        embedder = SentenceTransformer('all-MiniLM-L6-v2')
-        embeddings = embedder.encode(chunks, show_progress_bar=False)
-        
-        ids = [str(uuid.uuid4()) for _ in chunks]
-        collection.add(
-            documents=chunks,
-            embeddings=embeddings,
-            ids=ids
-        )
-        return collection
-    
-    except Exception as e:
-        raise ValueError(f"Error storing chunks in ChromaDB: {str(e)}")
-
-def retrieve_relevant_chunks(query: str, collection, top_k: int = 3) -> List[str]:
-    """Retrieves relevant chunks from ChromaDB based on query."""
-    try:
-        embedder = SentenceTransformer('all-MiniLM-L6-v2')
-        query_embedding = embedder.encode([query], show_progress_bar=False)[0]
-        
-        results = collection.query(
-            query_embeddings=[query_embedding],
-            n_results=top_k
-        )
-        
-        return results['documents'][0] if results['documents'] else []
-    
-    except Exception as e:
-        raise ValueError(f"Error retrieving chunks from ChromaDB: {str(e)}")
+# The pipeline lives in pdf_pipeline so the server and batch ingester share this
+# process's state instead of importing this script a second time as a module
+from pdf_pipeline import (
+    DEFAULT_CONTEXT_BUDGET,
+    ingest_pdf,
+    load_bm25_index,
+    merge_where,
+    open_query_collection,
+    stream_answer,
+    telemetry,
+    tenant_scope,
+)
+from answer_cache import AnswerCache
+from embedding_cache import EmbeddingCache
+from embedding_service import BACKENDS, get_embedding_service, set_default_backend
+from telemetry import configure as configure_telemetry
 
-def call_gemini_api(prompt: str, context: List[str], api_key: str, model_name: str = "gemini-1.5-flash") -> str:
-    """Calls Gemini API with prompt and context."""
-    if not prompt.strip():
-        raise ValueError("Prompt cannot be empty.")
-    if not api_key:
-        raise ValueError("API key cannot be empty.")
-    
+def parse_where(text: Optional[str]) -> Optional[Dict]:
+    """Parses a JSON Chroma metadata filter such as '{"section": "Introduction"}'."""
+    if not text:
+        return None
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel(model_name)
-        
-        context_text = "\n\n".join(context) if context else "No context provided."
-        full_prompt = f"Context:\n{context_text}\n\nQuestion: {prompt}\nAnswer concisely based on the context."
-        
-        response = model.generate_content(full_prompt)
-        return response.text.strip() if response.text else "No valid response received."
-    
-    except GoogleAPIError as e:
-        raise GoogleAPIError(f"Error calling Gemini API: {str(e)}")
-    except Exception as e:
-        raise Exception(f"Unexpected error: {str(e)}")
+        where = json.loads(text)
+    except ValueError as e:
+        raise ValueError(f"--where must be a JSON object: {str(e)}")
+    if not isinstance(where, dict):
+        raise ValueError("--where must be a JSON object.")
+    return where
 
 def get_pdf_filename() -> str:
     """Prompts user for a PDF file name and validates it."""
@@ -160,51 +55,148 @@ def get_user_query() -> str:
             continue
         return query
 
+def _is_google_api_error(error: Exception) -> bool:
+    # If google.api_core was never imported, the error cannot be one of its exceptions
+    exceptions = sys.modules.get("google.api_core.exceptions")
+    return exceptions is not None and isinstance(error, exceptions.GoogleAPIError)
+
 def main():
-    parser = argparse.ArgumentParser(description="PDF Query Tool: Extract, chunk, store, and query PDF content.")
+    # `pdf_chat.py ingest PATH...` ingests whole directories or globs non-interactively
+    if sys.argv[1:2] == ["ingest"]:
+        from batch_ingest import main as batch_ingest_main
+        batch_ingest_main(sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(description="PDF Query Tool: Extract, chunk, store, and query PDF content.",
+                                     epilog="Run 'pdf_chat.py ingest --help' to ingest directories or globs of PDFs.")
     parser.add_argument("--collection", help="ChromaDB collection name", default="pdf_chunks")
+    parser.add_argument("--embedding-cache", help="Directory for cached embeddings (empty to disable)",
+                        default="./embedding_cache")
+    parser.add_argument("--embedding-backend", choices=BACKENDS, default=None,
+                        help="Embedding runtime: torch, onnx (ONNX Runtime) or int8 (quantized ONNX); "
+                             "defaults to $PDF_CHAT_EMBEDDING_BACKEND or torch")
+    parser.add_argument("--answer-cache", help="JSON file for cached answers (empty to disable)",
+                        default="./answer_cache.json")
+    parser.add_argument("--answer-similarity", type=float, default=None,
+                        help="Reuse answers for questions whose embeddings reach this cosine similarity")
+    parser.add_argument("--hybrid", action="store_true",
+                        help="Combine BM25 keyword matches with vector search (reciprocal-rank fusion)")
+    parser.add_argument("--context-budget", type=int, default=DEFAULT_CONTEXT_BUDGET,
+                        help="Token budget for retrieved context sent to Gemini (0 sends chunks verbatim)")
+    parser.add_argument("--pdf", help="PDF file to ingest (prompted for when omitted)")
+    parser.add_argument("--tenant", help="Tenant to ingest for and to restrict retrieval to")
+    parser.add_argument("--shard-by-tenant", action="store_true",
+                        help="Keep each tenant in its own collection; without --tenant, queries fan out over all shards")
+    parser.add_argument("--where", help="JSON Chroma metadata filter for retrieval, e.g. '{\"section\": \"Introduction\"}'")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--ingest-only", action="store_true", help="Ingest the PDF and exit without asking a question")
+    mode.add_argument("--query-only", action="store_true",
+                      help="Ask a question against an already ingested collection without reading a PDF")
+    mode.add_argument("--serve", action="store_true",
+                      help="Run a resident HTTP server with /ingest and /ask endpoints instead of the one-shot CLI")
+    parser.add_argument("--host", default="127.0.0.1", help="Host for --serve")
+    parser.add_argument("--port", type=int, default=8765, help="Port for --serve")
+    parser.add_argument("--socket", help="Serve on this Unix socket path instead of host/port")
+    parser.add_argument("--telemetry", action="append", default=[], metavar="EXPORTER",
+                        help="Export spans and metrics: 'log' (stderr lines), 'prometheus=PATH' (text file) "
+                             "or 'otel' (OpenTelemetry); repeatable")
     args = parser.parse_args()
     
     try:
+        where = parse_where(args.where)
+        if args.hybrid and args.shard_by_tenant and not args.tenant and not args.ingest_only:
+            raise ValueError("--hybrid with --shard-by-tenant needs --tenant; keyword indexes are kept per shard.")
+        if "log" in args.telemetry:
+            logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+        configure_telemetry(args.telemetry)
+        if args.embedding_backend:
+            set_default_backend(args.embedding_backend)
+        
+
         api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
+        if not api_key and not args.ingest_only:
             raise ValueError("GEMINI_API_KEY environment variable not set.")
         
-        print("Please provide the PDF file to process.")
-        pdf_path = get_pdf_filename()
-        
-        print("Extracting and chunking PDF...")
-        chunks = chunk_pdf_text(pdf_path)
-        print(f"Extracted {len(chunks)} chunks.")
-        
-        print("Storing chunks in ChromaDB...")
-        collection = store_chunks_in_chromadb(chunks, args.collection)
-        print("Chunks stored successfully.")
+        if args.embedding_cache:
+            embedder = get_embedding_service()
+            embedder.attach_cache(EmbeddingCache(args.embedding_cache, embedder.cache_name))
+
+        answer_cache = None
+        if args.answer_cache:
+            answer_cache = AnswerCache(similarity_threshold=args.answer_similarity, path=args.answer_cache)
+
+        if args.serve:
+            from pdf_chat_server import PDFChatService, serve
+            service = PDFChatService(api_key, default_collection=args.collection, answer_cache=answer_cache,
+                                     hybrid=args.hybrid, context_budget=args.context_budget or None,
+                                     shard_by_tenant=args.shard_by_tenant)
+            serve(service, args.host, args.port, args.socket)
+            return
+
+        if args.query_only:
+            collection, tenant_where = open_query_collection(args.collection, args.tenant, args.shard_by_tenant)
+            if collection.count() == 0:
+                raise ValueError(f"Collection '{collection.name}' is empty; ingest a PDF first.")
+        else:
+            if args.pdf:
+                pdf_path = args.pdf
+                if not pdf_path.lower().endswith('.pdf'):
+                    raise ValueError("File must have a .pdf extension.")
+                if not os.path.isfile(pdf_path):
+                    raise FileNotFoundError(f"File '{pdf_path}' not found.")
+            else:
+                print("Please provide the PDF file to process.")
+                pdf_path = get_pdf_filename()
+            
+            print("Extracting, chunking and storing PDF in ChromaDB...")
+            collection_name, tenant_where = tenant_scope(args.collection, args.tenant, args.shard_by_tenant)
+            collection, summary = ingest_pdf(pdf_path, collection_name, tenant=args.tenant)
+            if summary["status"] == "unchanged":
+                print(f"PDF unchanged since last run; reusing {summary['chunks']} stored chunks.")
+            else:
+                print(f"Stored {summary['chunks']} chunks ({summary['embedded']} newly embedded at "
+                      f"{summary['docs_per_second']:.1f} chunks/s, {summary['removed']} removed).")
+            if args.ingest_only:
+                return
         
         print("\nNow you can ask a question about the PDF content.")
         query = get_user_query()
         
-        print("Retrieving relevant chunks...")
-        relevant_chunks = retrieve_relevant_chunks(query, collection)
-        if not relevant_chunks:
-            print("No relevant chunks found for the query.")
-            return
-        
-        print("Calling Gemini API to answer query...")
-        response = call_gemini_api(query, relevant_chunks, api_key)
-        print("\nAnswer:")
-        print("-" * 50)
-        print(response)
-        print("-" * 50)
+        print("Retrieving relevant chunks and answering query...")
+        bm25_index = load_bm25_index(collection) if args.hybrid else None
+        with telemetry.span("answer"):
+            pieces = stream_answer(query, collection, api_key, answer_cache=answer_cache, bm25_index=bm25_index,
+                                   context_budget=args.context_budget or None,
+                                   where=merge_where(tenant_where, where))
+            if pieces is None:
+                print("No relevant chunks found for the query.")
+                return
+            
+            print("\nAnswer:")
+            print("-" * 50)
+            # Print the answer as it is generated rather than after the whole response
+            answered = False
+            for text in pieces:
+                print(text, end="", flush=True)
+                answered = True
+            print("" if answered else "No valid response received.")
+            print("-" * 50)
+        if answer_cache is not None:
+            stats = answer_cache.stats()
+            print(f"Answer cache: {stats['hits']} hits, {stats['misses']} misses "
+                  f"(hit rate {stats['hit_rate']:.0%}).")
     
     except FileNotFoundError as fnf:
         print(f"Error: {str(fnf)}")
     except ValueError as ve:
         print(f"Error: {str(ve)}")
-    except GoogleAPIError as gae:
-        print(f"API Error: {str(gae)}")
     except Exception as e:
-        print(f"Unexpected Error: {str(e)}")
+        if _is_google_api_error(e):
+            print(f"API Error: {str(e)}")
+        else:
+            print(f"Unexpected Error: {str(e)}")
+    finally:
+        telemetry.flush()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,219 @@
+import json
+import os
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from google.api_core.exceptions import GoogleAPIError
+
+import pdf_pipeline
+from sharding import SHARD_SEPARATOR, ShardedCollection
+
+
+class PDFChatService:
+    """State kept warm between requests: Chroma client, collections, embedder, LLM client and answer cache."""
+
+    def __init__(self, api_key: str, persist_dir: str = "./chroma_db", default_collection: str = "pdf_chunks",
+                 model_name: str = "gemini-1.5-flash", answer_cache=None, hybrid: bool = False,
+                 context_budget: Optional[int] = pdf_pipeline.DEFAULT_CONTEXT_BUDGET, shard_by_tenant: bool = False):
+        if not api_key:
+            raise ValueError("API key cannot be empty.")
+        self.api_key = api_key
+        self.persist_dir = persist_dir
+        self.default_collection = default_collection
+        self.model_name = model_name
+        self.answer_cache = answer_cache
+        self.hybrid = hybrid
+        self.context_budget = context_budget
+        self.shard_by_tenant = shard_by_tenant
+        self._collections: Dict[str, object] = {}
+        self._collections_lock = threading.Lock()
+        # Ingests rewrite the shared manifest, so they run one at a time
+        self._ingest_lock = threading.Lock()
+
+    def warm_up(self):
+        """Loads the embedding model and opens the Chroma and Gemini clients before the first request."""
+        _ = pdf_pipeline.get_embedding_service().model
+        pdf_pipeline.get_chroma_client(self.persist_dir)
+        pdf_pipeline.get_gemini_client(self.api_key).model(self.model_name)
+
+    def collection(self, name: Optional[str], tenant: Optional[str] = None):
+        """Returns the collection to query and the tenant filter to apply to it.
+
+        With shard_by_tenant a tenant maps to its own shard collection and a request without
+        a tenant searches every shard; otherwise tenants share the collection and are filtered.
+        """
+        name = name or self.default_collection
+        if self.shard_by_tenant and not tenant:
+            key = name + SHARD_SEPARATOR + "*"
+            with self._collections_lock:
+                collection = self._collections.get(key)
+                if collection is None:
+                    collection = ShardedCollection(pdf_pipeline.get_chroma_client(self.persist_dir), name)
+                    self._collections[key] = collection
+                return collection, None
+        name, where = pdf_pipeline.tenant_scope(name, tenant, self.shard_by_tenant)
+        with self._collections_lock:
+            collection = self._collections.get(name)
+            if collection is None:
+                client = pdf_pipeline.get_chroma_client(self.persist_dir)
+                collection = client.get_or_create_collection(name=name)
+                self._collections[name] = collection
+            return collection, where
+
+    def ingest(self, pdf_path: str, collection_name: Optional[str] = None, tenant: Optional[str] = None) -> Dict:
+        if not pdf_path or not pdf_path.lower().endswith(".pdf"):
+            raise ValueError("pdf_path must name a .pdf file.")
+        if not os.path.isfile(pdf_path):
+            raise FileNotFoundError(f"PDF file not found at: {pdf_path}")
+        base = collection_name or self.default_collection
+        name, _ = pdf_pipeline.tenant_scope(base, tenant, self.shard_by_tenant)
+        with self._ingest_lock:
+            collection, summary = pdf_pipeline.ingest_pdf(pdf_path, name, self.persist_dir, tenant=tenant)
+        with self._collections_lock:
+            self._collections[name] = collection
+            # The cross-tenant view lists shards when built; a new shard needs a fresh view
+            self._collections.pop(base + SHARD_SEPARATOR + "*", None)
+        return dict(summary, collection=name, tenant=tenant or pdf_pipeline.DEFAULT_TENANT)
+
+    def ask(self, question: str, collection_name: Optional[str] = None, top_k: int = 3,
+            tenant: Optional[str] = None, where: Optional[Dict] = None):
+        if not question or not question.strip():
+            raise ValueError("Query cannot be empty.")
+        if where is not None and not isinstance(where, dict):
+            raise ValueError("where must be a JSON object.")
+        collection, tenant_where = self.collection(collection_name, tenant)
+        bm25_index = None
+        if self.hybrid:
+            if isinstance(collection, ShardedCollection):
+                raise ValueError("Hybrid search over sharded collections needs a tenant.")
+            bm25_index = pdf_pipeline.load_bm25_index(collection, self.persist_dir)
+        return pdf_pipeline.stream_answer(question, collection, self.api_key,
+                                      self.model_name, top_k, self.answer_cache, bm25_index,
+                                      self.context_budget, pdf_pipeline.merge_where(tenant_where, where))
+
+
+class PDFChatRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    service: PDFChatService = None
+
+    def _send_json(self, status: int, payload: Dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        try:
+            request = json.loads(self.rfile.read(length))
+        except ValueError:
+            raise ValueError("Request body must be valid JSON.")
+        if not isinstance(request, dict):
+            raise ValueError("Request body must be a JSON object.")
+        return request
+
+    def _send_stream(self, pieces):
+        # Chunked transfer lets clients show the answer while it is generated
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for text in pieces:
+                data = text.encode("utf-8")
+                self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+        except Exception as e:
+            # Headers are already sent; dropping the connection tells the client the answer is incomplete
+            self.log_error("Streaming answer failed: %s", str(e))
+            self.close_connection = True
+            return
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            body = pdf_pipeline.telemetry.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if self.path != "/health":
+            self._send_json(404, {"error": f"Unknown endpoint: {self.path}"})
+            return
+        payload = {"status": "ok"}
+        if self.service.answer_cache is not None:
+            payload["answer_cache"] = self.service.answer_cache.stats()
+        self._send_json(200, payload)
+
+    def do_POST(self):
+        try:
+            request = self._read_json()
+            if self.path == "/ingest":
+                self._send_json(200, self.service.ingest(request.get("pdf_path"), request.get("collection"),
+                                                         request.get("tenant")))
+            elif self.path == "/ask":
+                # One span per request so slow answers can be attributed to retrieval, embedding or the LLM
+                with pdf_pipeline.telemetry.span("answer", stream=bool(request.get("stream"))):
+                    pieces = self.service.ask(request.get("question"), request.get("collection"),
+                                              int(request.get("top_k", 3)), request.get("tenant"),
+                                              request.get("where"))
+                    if pieces is None:
+                        self._send_json(404, {"error": "No relevant chunks found for the query."})
+                    elif request.get("stream"):
+                        self._send_stream(pieces)
+                    else:
+                        answer = "".join(pieces).strip() or "No valid response received."
+                        self._send_json(200, {"answer": answer})
+            else:
+                self._send_json(404, {"error": f"Unknown endpoint: {self.path}"})
+        except FileNotFoundError as fnf:
+            self._send_json(404, {"error": str(fnf)})
+        except ValueError as ve:
+            self._send_json(400, {"error": str(ve)})
+        except GoogleAPIError as gae:
+            self._send_json(502, {"error": f"API Error: {str(gae)}"})
+        except Exception as e:
+            self._send_json(500, {"error": f"Unexpected Error: {str(e)}"})
+
+    def address_string(self):
+        # Unix-socket peers have no host/port
+        return self.client_address[0] if self.client_address else "unix-socket"
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        super().server_bind()
+
+
+def serve(service: PDFChatService, host: str = "127.0.0.1", port: int = 8765, socket_path: Optional[str] = None):
+    """Runs the HTTP API (POST /ingest, POST /ask, GET /health, GET /metrics) until interrupted."""
+    handler = type("BoundPDFChatRequestHandler", (PDFChatRequestHandler,), {"service": service})
+    if socket_path:
+        server = ThreadingUnixHTTPServer(socket_path, handler)
+        location = f"unix socket {socket_path}"
+    else:
+        server = ThreadingHTTPServer((host, port), handler)
+        location = f"http://{host}:{port}"
+
+    print("Loading models and clients...")
+    service.warm_up()
+    print(f"PDF chat server listening on {location}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+    finally:
+        server.server_close()
+        pdf_pipeline.telemetry.flush()
@@ -0,0 +1,526 @@
+# The pdf_chat pipeline: extraction, chunking, ingest, retrieval and answering.
+# pdf_chat.py (the CLI), pdf_chat_server and batch_ingest all import this module,
+# so the Chroma clients, embedding services and telemetry exist once per process.
+import os
+import re
+import sys
+import time
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Heavy dependencies (PyMuPDF, chromadb, sentence_transformers/torch, the Gemini SDK)
+# are imported inside the stage that needs them so --help and query-only or
+# ingest-only runs do not pay for the rest.
+
+# Reuse the extractor, chunker and Chroma helpers from the earlier days' folders
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for _day in ("May 12", "May 13"):
+    _day_dir = os.path.join(_REPO_ROOT, _day)
+    if _day_dir not in sys.path:
+        sys.path.append(_day_dir)
+
+from answer_cache import AnswerCache, make_answer_key
+from chromadb_setup import bulk_load, iter_documents, resolve_max_batch_size
+from context_packer import estimate_tokens, pack_context
+from embedding_service import EmbeddingService, get_embedding_service
+from hybrid_search import BM25Index, get_bm25_index, reciprocal_rank_fusion
+from ingest_cache import DEFAULT_TENANT, chunk_id, compute_ingest_key, document_id, load_manifest, save_manifest
+from sharding import ShardedCollection, shard_name
+from telemetry import get_telemetry
+from extract_pdf_text import iter_pdf_pages
+from text_chunker import iter_chunks
+
+# Spans, counters and latency histograms for every stage; exporters are chosen with --telemetry
+telemetry = get_telemetry()
+
+def iter_pdf_chunks(pdf_path: str, max_tokens: int = 512, min_chunk_size: int = 50,
+                    overlap_tokens: int = 0, token_counter=None) -> Iterator[str]:
+    """Streams chunks from a PDF while its pages are still being extracted."""
+    try:
+        yield from iter_chunks(iter_pdf_pages(pdf_path), max_tokens, min_chunk_size, overlap_tokens, token_counter)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"PDF file not found at: {pdf_path}")
+    except Exception as e:
+        raise ValueError(f"Error processing PDF: {str(e)}")
+
+# Labelled or numbered headings such as "Chapter 3", "Part II" or "2.1 Results"
+_HEADING_PREFIX = re.compile(r"^(?:(?i:chapter|section|part|appendix)\s+(?:\d+|[IVXLC]+|[A-Z])\b|\d+(?:\.\d+)*\.?\s+[A-Z])")
+
+def _is_heading(line: str) -> bool:
+    # Short lines without closing punctuation that are labelled, numbered, all caps or title case
+    line = line.strip()
+    words = line.split()
+    if not words or len(words) > 10 or len(line) > 80 or line[-1] in ".,;:!?\"'":
+        return False
+    if _HEADING_PREFIX.match(line):
+        return True
+    long_words = [word for word in words if word[0].isalpha() and len(word) > 3]
+    if not long_words:
+        # Wrapped fragments such as "of the day" have no word to judge them by
+        return False
+    return line.isupper() or all(word[0].isupper() for word in long_words)
+
+def iter_chunk_records(pdf_path: str, max_tokens: int = 512, min_chunk_size: int = 50,
+                       overlap_tokens: int = 0) -> Iterator[Dict]:
+    """Streams chunks with where they came from: text, page_start, page_end, chunk_index and section.
+
+    Page ranges are conservative: a chunk is reported as ending on the page the chunker
+    was reading when it emitted the chunk. The section is the closest heading-like line
+    at or before the start of the chunk ("" before the first heading).
+    """
+    current_page = 0
+
+    def pages():
+        nonlocal current_page
+        for page_number, page_text in enumerate(iter_pdf_pages(pdf_path), 1):
+            current_page = page_number
+            yield page_text
+
+    page_start = 1
+    section = ""
+    try:
+        for index, chunk in enumerate(iter_chunks(pages(), max_tokens, min_chunk_size, overlap_tokens)):
+            headings = [line.strip() for line in chunk.splitlines() if _is_heading(line)]
+            starts_with_heading = bool(headings) and chunk.lstrip().startswith(headings[0])
+            yield {"text": chunk, "page_start": page_start, "page_end": current_page, "chunk_index": index,
+                   "section": headings[0] if starts_with_heading or (headings and not section) else section}
+            page_start = current_page
+            if headings:
+                section = headings[-1]
+    except FileNotFoundError:
+        raise FileNotFoundError(f"PDF file not found at: {pdf_path}")
+    except Exception as e:
+        raise ValueError(f"Error processing PDF: {str(e)}")
+
+def chunk_metadata(record: Dict, doc_id: str, source: str, tenant: Optional[str] = None,
+                   ingested_at: Optional[int] = None) -> Dict:
+    """Metadata stored with a chunk; every field can be used in a retrieval `where` filter."""
+    return {
+        "doc_id": doc_id,
+        "tenant": tenant or DEFAULT_TENANT,
+        "source": source,
+        "page_start": record["page_start"],
+        "page_end": record["page_end"],
+        "section": record["section"][:200],
+        "chunk_index": record["chunk_index"],
+        "ingested_at": int(ingested_at if ingested_at is not None else time.time()),
+    }
+
+def merge_where(*filters: Optional[Dict]) -> Optional[Dict]:
+    """Combines Chroma metadata filters with $and, ignoring empty ones."""
+    filters = [f for f in filters if f]
+    if not filters:
+        return None
+    return filters[0] if len(filters) == 1 else {"$and": filters}
+
+def chunk_pdf_text(pdf_path: str, max_tokens: int = 512, min_chunk_size: int = 50) -> List[str]:
+    """Extracts and chunks text from a PDF using PyMuPDF."""
+    chunks = list(iter_pdf_chunks(pdf_path, max_tokens, min_chunk_size))
+    return chunks if chunks else ["No valid chunks created."]
+
+_clients = {}
+
+def get_chroma_client(persist_dir: str = "./chroma_db"):
+    """Returns one PersistentClient per storage directory for the lifetime of the process."""
+    client = _clients.get(persist_dir)
+    if client is None:
+        import chromadb
+        client = chromadb.PersistentClient(path=persist_dir)
+        _clients[persist_dir] = client
+    return client
+
+def _bulk_store_chunks(chunks: Iterable[Tuple[str, Optional[Dict]]], collection_name: str, persist_dir: str,
+                       batch_size: int, doc_id: Optional[str], embedder: Optional[EmbeddingService] = None):
+    # chunks are (text, metadata) pairs
+    client = get_chroma_client(persist_dir)
+    collection = client.get_or_create_collection(name=collection_name)
+    embedder = embedder or get_embedding_service()
+
+    def records():
+        # Identical chunks map to the same ID; Chroma rejects duplicate IDs in one call
+        seen = set()
+        for chunk, metadata in chunks:
+            cid = chunk_id(chunk, doc_id)
+            if cid not in seen:
+                seen.add(cid)
+                yield cid, chunk, metadata
+
+    stats = bulk_load(collection, records(), embed_fn=embedder.encode, batch_size=batch_size,
+                      max_batch_size=resolve_max_batch_size(client), span=telemetry.span)
+    return collection, stats
+
+def store_chunks_in_chromadb(chunks: Iterable[str], collection_name: str, persist_dir: str = "./chroma_db",
+                             batch_size: int = 256, doc_id: Optional[str] = None, tenant: Optional[str] = None,
+                             metadata: Optional[Dict] = None):
+    """Upserts chunks into ChromaDB under content-derived IDs, embedding the next batch while the previous one is written.
+
+    Each chunk is stored with its doc_id, tenant, chunk_index and ingested_at plus any extra metadata.
+    """
+    ingested_at = int(time.time())
+    base = dict(metadata or {}, tenant=tenant or DEFAULT_TENANT, ingested_at=ingested_at)
+    if doc_id:
+        base["doc_id"] = doc_id
+    try:
+        with_metadata = ((chunk, dict(base, chunk_index=index)) for index, chunk in enumerate(chunks))
+        collection, _ = _bulk_store_chunks(with_metadata, collection_name, persist_dir, batch_size, doc_id)
+        return collection
+    
+    except Exception as e:
+        raise ValueError(f"Error storing chunks in ChromaDB: {str(e)}")
+
+def _timed_iter(iterable: Iterable, stage: str) -> Iterator:
+    # Extraction and chunking run lazily inside the embedding loop, so their time is
+    # summed across next() calls and recorded once the iterator is exhausted
+    iterator = iter(iterable)
+    elapsed = 0.0
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            telemetry.observe("stage_seconds", elapsed + time.perf_counter() - start, stage=stage)
+            return
+        elapsed += time.perf_counter() - start
+        yield item
+
+def ingest_pdf(pdf_path: str, collection_name: str, persist_dir: str = "./chroma_db",
+               max_tokens: int = 512, min_chunk_size: int = 50, overlap_tokens: int = 0,
+               tenant: Optional[str] = None, embedder: Optional[EmbeddingService] = None):
+    """Ingests a PDF unless the same content was already ingested with the same chunker settings.
+
+    Returns the collection and a summary dict. Only chunks that are new since the previous
+    ingest of the same file are embedded; chunks that disappeared are deleted. Chunks carry
+    chunk_metadata() (document ID, tenant, pages, section, ingest time) for filtered retrieval.
+    `embedder` defaults to the process-wide embedding service.
+    """
+    with telemetry.span("ingest", source=os.path.basename(pdf_path), collection=collection_name) as span:
+        collection, summary = _ingest_pdf(pdf_path, collection_name, persist_dir, max_tokens, min_chunk_size,
+                                          overlap_tokens, tenant, embedder)
+        span.set_attribute("status", summary["status"])
+    telemetry.incr("chunks_embedded", summary["embedded"])
+    telemetry.incr("chunks_removed", summary["removed"])
+    return collection, summary
+
+def _ingest_pdf(pdf_path: str, collection_name: str, persist_dir: str, max_tokens: int, min_chunk_size: int,
+                overlap_tokens: int, tenant: Optional[str], embedder: Optional[EmbeddingService]):
+    chunker_params = {"max_tokens": max_tokens, "min_chunk_size": min_chunk_size, "overlap_tokens": overlap_tokens}
+    key = compute_ingest_key(pdf_path, chunker_params)
+    tenant = tenant or DEFAULT_TENANT
+    doc_id = document_id(pdf_path, tenant)
+    source = os.path.abspath(pdf_path)
+    ingested_at = int(time.time())
+
+    manifest = load_manifest(persist_dir)
+    entries = manifest.setdefault(collection_name, {})
+    previous = entries.get(doc_id, {})
+    collection = get_chroma_client(persist_dir).get_or_create_collection(name=collection_name)
+
+    # Entries written before chunks carried metadata have no tenant; they fall through and only get their metadata set
+    if previous.get("ingest_key") == key and "tenant" in previous and collection.count() > 0:
+        return collection, {"status": "unchanged", "chunks": len(previous["chunk_ids"]), "embedded": 0, "removed": 0,
+                            "docs_per_second": 0.0}
+
+    known_ids = set(previous.get("chunk_ids", []))
+    seen_ids = []
+    embedded = 0
+    bm25_index = get_bm25_index(persist_dir, collection_name)
+    # Kept chunks may have moved to other pages or positions; their metadata is refreshed without re-embedding
+    moved: Dict[str, Dict] = {}
+
+    def new_chunks():
+        nonlocal embedded
+        for record in _timed_iter(iter_chunk_records(pdf_path, max_tokens, min_chunk_size, overlap_tokens),
+                                  "extract_chunk"):
+            chunk = record["text"]
+            cid = chunk_id(chunk, doc_id)
+            seen_ids.append(cid)
+            metadata = chunk_metadata(record, doc_id, source, tenant, ingested_at)
+            if cid in known_ids:
+                moved.setdefault(cid, metadata)
+            else:
+                embedded += 1
+                bm25_index.add([(cid, chunk)])
+                yield chunk, metadata
+
+    try:
+        _, stats = _bulk_store_chunks(new_chunks(), collection_name, persist_dir, 256, doc_id, embedder)
+        update_metadata(collection, moved, resolve_max_batch_size(get_chroma_client(persist_dir)))
+    except Exception as e:
+        raise ValueError(f"Error storing chunks in ChromaDB: {str(e)}")
+
+    stale_ids = list(known_ids.difference(seen_ids))
+    if stale_ids:
+        collection.delete(ids=stale_ids)
+        bm25_index.remove(stale_ids)
+    bm25_index.save()
+
+    entries[doc_id] = {
+        "source": source,
+        "tenant": tenant,
+        "ingest_key": key,
+        "chunk_ids": list(dict.fromkeys(seen_ids)),
+    }
+    save_manifest(persist_dir, manifest)
+    return collection, {"status": "updated", "chunks": len(entries[doc_id]["chunk_ids"]),
+                        "embedded": embedded, "removed": len(stale_ids),
+                        "docs_per_second": stats["docs_per_second"]}
+
+def update_metadata(collection, metadatas: Dict[str, Dict], batch_size: int):
+    """Rewrites the metadata of existing chunks ({chunk_id: metadata}) without touching their embeddings."""
+    ids = list(metadatas)
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        collection.update(ids=batch, metadatas=[metadatas[cid] for cid in batch])
+
+def retrieve_chunks_with_ids(query: str, collection, top_k: int = 3, bm25_index: Optional[BM25Index] = None,
+                             candidates: int = 20, where: Optional[Dict] = None,
+                             embedder: Optional[EmbeddingService] = None):
+    """Retrieves relevant chunks with their IDs; also returns the query embedding for reuse.
+
+    With a BM25 index, the top `candidates` vector hits and keyword hits are merged by
+    reciprocal-rank fusion before keeping top_k, so exact terms are not missed. `where`
+    is a Chroma metadata filter (see chunk_metadata) applied inside the vector search
+    and to the keyword hits, so only matching chunks compete for top_k. `embedder`
+    defaults to the process-wide embedding service.
+    """
+    try:
+        with telemetry.span("retrieve", hybrid=bm25_index is not None, filtered=bool(where)) as span:
+            ids, documents, query_embedding = _retrieve(query, collection, top_k, bm25_index, candidates, where,
+                                                        embedder)
+            span.set_attribute("chunks", len(ids))
+        telemetry.incr("chunks_retrieved", len(ids))
+        return ids, documents, query_embedding
+    
+    except Exception as e:
+        raise ValueError(f"Error retrieving chunks from ChromaDB: {str(e)}")
+
+def _retrieve(query: str, collection, top_k: int, bm25_index: Optional[BM25Index], candidates: int,
+              where: Optional[Dict], embedder: Optional[EmbeddingService]):
+    with telemetry.span("embed_query"):
+        # Queued so concurrent queries (e.g. server threads) are embedded together in one batch
+        query_embedding = (embedder or get_embedding_service()).encode_queued([query])[0]
+    
+    with telemetry.span("vector_search"):
+        results = collection.query(
+            query_embeddings=[query_embedding],
+            n_results=max(top_k, candidates) if bm25_index is not None else top_k,
+            where=where or None
+        )
+    
+    if not results['documents']:
+        return [], [], query_embedding
+    ids, documents = results['ids'][0], results['documents'][0]
+    if bm25_index is None:
+        return ids, documents, query_embedding
+
+    with telemetry.span("keyword_search"):
+        keyword_ids = [cid for cid, _ in bm25_index.search(query, candidates)]
+        if where and keyword_ids:
+            # The BM25 index has no metadata; keep only keyword hits that pass the filter
+            allowed = set(collection.get(ids=keyword_ids, where=where, include=[])['ids'])
+            keyword_ids = [cid for cid in keyword_ids if cid in allowed]
+        fused_ids = [cid for cid, _ in reciprocal_rank_fusion([ids, keyword_ids])][:top_k]
+        texts = dict(zip(ids, documents))
+        missing = [cid for cid in fused_ids if cid not in texts]
+        if missing:
+            fetched = collection.get(ids=missing, include=["documents"])
+            texts.update(zip(fetched['ids'], fetched['documents']))
+    # Keyword hits whose chunks were deleted from Chroma are skipped
+    fused_ids = [cid for cid in fused_ids if cid in texts]
+    return fused_ids, [texts[cid] for cid in fused_ids], query_embedding
+
+def load_bm25_index(collection, persist_dir: str = "./chroma_db") -> BM25Index:
+    """Returns the collection's BM25 index, building it from stored chunks if it does not exist yet."""
+    index = get_bm25_index(persist_dir, collection.name)
+    if len(index) == 0 and collection.count() > 0:
+        index.add((record["id"], record["document"]) for record in iter_documents(collection, include=("documents",)))
+        index.save()
+    return index
+
+def retrieve_relevant_chunks(query: str, collection, top_k: int = 3, where: Optional[Dict] = None) -> List[str]:
+    """Retrieves relevant chunks from ChromaDB based on query."""
+    _, documents, _ = retrieve_chunks_with_ids(query, collection, top_k, where=where)
+    return documents
+
+PROMPT_TEMPLATE = "Context:\n{context}\n\nQuestion: {question}\nAnswer concisely based on the context."
+
+def _build_prompt(prompt: str, context: List[str]) -> str:
+    if not prompt.strip():
+        raise ValueError("Prompt cannot be empty.")
+    context_text = "\n\n".join(context) if context else "No context provided."
+    return PROMPT_TEMPLATE.format(context=context_text, question=prompt)
+
+def _count_llm_retry(error: Exception):
+    telemetry.incr("llm_retries", error=type(error).__name__)
+
+def get_gemini_client(api_key: str):
+    """Returns the shared Gemini client, importing the SDK on first use."""
+    from gemini_client import get_gemini_client as get_client
+    return get_client(api_key, on_retry=_count_llm_retry)
+
+def _count_tokens(counter: str, text: str):
+    # Estimated once on the whole prompt or answer so counters stay whole numbers
+    telemetry.incr(counter, round(estimate_tokens(text or "")))
+
+def call_gemini_api(prompt: str, context: List[str], api_key: str, model_name: str = "gemini-1.5-flash") -> str:
+    """Calls Gemini API with prompt and context."""
+    if not prompt.strip():
+        raise ValueError("Prompt cannot be empty.")
+    if not api_key:
+        raise ValueError("API key cannot be empty.")
+    from google.api_core.exceptions import GoogleAPIError
+    
+    try:
+        full_prompt = _build_prompt(prompt, context)
+        _count_tokens("prompt_tokens", full_prompt)
+        
+        with telemetry.span("llm", model=model_name):
+            response = get_gemini_client(api_key).generate_sync(full_prompt, model_name)
+        _count_tokens("completion_tokens", response)
+        return response if response else "No valid response received."
+    
+    except GoogleAPIError as e:
+        raise GoogleAPIError(f"Error calling Gemini API: {str(e)}")
+    except Exception as e:
+        raise Exception(f"Unexpected error: {str(e)}")
+
+def stream_gemini_api(prompt: str, context: List[str], api_key: str, model_name: str = "gemini-1.5-flash") -> Iterator[str]:
+    """Streams the Gemini answer for prompt and context as text pieces arrive."""
+    from google.api_core.exceptions import GoogleAPIError
+
+    full_prompt = _build_prompt(prompt, context)
+    _count_tokens("prompt_tokens", full_prompt)
+    try:
+        with telemetry.span("llm", model=model_name, stream=True):
+            start = time.perf_counter()
+            first = True
+            parts = []
+            try:
+                for text in get_gemini_client(api_key).stream_sync(full_prompt, model_name):
+                    if first:
+                        telemetry.observe("llm_first_token_seconds", time.perf_counter() - start)
+                        first = False
+                    parts.append(text)
+                    yield text
+            finally:
+                _count_tokens("completion_tokens", "".join(parts))
+    except GoogleAPIError as e:
+        raise GoogleAPIError(f"Error calling Gemini API: {str(e)}")
+
+async def astream_gemini_api(prompt: str, context: List[str], api_key: str,
+                             model_name: str = "gemini-1.5-flash") -> AsyncIterator[str]:
+    """Async counterpart of stream_gemini_api."""
+    from google.api_core.exceptions import GoogleAPIError
+
+    full_prompt = _build_prompt(prompt, context)
+    _count_tokens("prompt_tokens", full_prompt)
+    try:
+        with telemetry.span("llm", model=model_name, stream=True):
+            start = time.perf_counter()
+            first = True
+            parts = []
+            try:
+                async for text in get_gemini_client(api_key).stream(full_prompt, model_name):
+                    if first:
+                        telemetry.observe("llm_first_token_seconds", time.perf_counter() - start)
+                        first = False
+                    parts.append(text)
+                    yield text
+            finally:
+                _count_tokens("completion_tokens", "".join(parts))
+    except GoogleAPIError as e:
+        raise GoogleAPIError(f"Error calling Gemini API: {str(e)}")
+
+DEFAULT_CONTEXT_BUDGET = 1200
+
+def _prepare_answer(query: str, collection, model_name: str, top_k: int, answer_cache: Optional[AnswerCache],
+                    bm25_index: Optional[BM25Index], context_budget: Optional[int], where: Optional[Dict]):
+    # Shared by answer_query and stream_answer: retrieval, context packing and cache lookup.
+    # The cache key covers the retrieved chunk IDs, so filtered and unfiltered answers never mix.
+    context_ids, context, query_embedding = retrieve_chunks_with_ids(query, collection, top_k, bm25_index,
+                                                                     where=where)
+    if not context:
+        return None, None, None, None
+
+    if context_budget:
+        with telemetry.span("pack_context", budget=context_budget):
+            context = pack_context(query, context, context_budget)
+
+    key = make_answer_key(model_name, f"{PROMPT_TEMPLATE}|budget={context_budget}", context_ids)
+    cached = None
+    if answer_cache is not None:
+        cached = answer_cache.get(key, query, query_embedding)
+        telemetry.incr("answer_cache_lookups", result="miss" if cached is None else "hit")
+    return context, key, query_embedding, cached
+
+def answer_query(query: str, collection, api_key: str, model_name: str = "gemini-1.5-flash",
+                 top_k: int = 3, answer_cache: Optional[AnswerCache] = None,
+                 bm25_index: Optional[BM25Index] = None,
+                 context_budget: Optional[int] = DEFAULT_CONTEXT_BUDGET,
+                 where: Optional[Dict] = None) -> Optional[str]:
+    """Retrieves context and asks Gemini, serving repeat questions over the same context from the cache.
+
+    Retrieved chunks are deduplicated and packed into context_budget tokens (None sends them verbatim).
+    `where` restricts retrieval to chunks whose metadata matches the Chroma filter.
+    """
+    with telemetry.span("answer"):
+        context, key, query_embedding, cached = _prepare_answer(query, collection, model_name, top_k,
+                                                                answer_cache, bm25_index, context_budget, where)
+        if not context:
+            return None
+        if cached is not None:
+            return cached
+
+        response = call_gemini_api(query, context, api_key, model_name)
+        if answer_cache is not None:
+            answer_cache.put(key, query, response, query_embedding)
+        return response
+
+def stream_answer(query: str, collection, api_key: str, model_name: str = "gemini-1.5-flash",
+                  top_k: int = 3, answer_cache: Optional[AnswerCache] = None,
+                  bm25_index: Optional[BM25Index] = None,
+                  context_budget: Optional[int] = DEFAULT_CONTEXT_BUDGET,
+                  where: Optional[Dict] = None) -> Optional[Iterator[str]]:
+    """Like answer_query, but returns an iterator of answer pieces (None if nothing was retrieved).
+
+    Callers that want one span for the whole answer open it around retrieval and consumption.
+    """
+    context, key, query_embedding, cached = _prepare_answer(query, collection, model_name, top_k,
+                                                            answer_cache, bm25_index, context_budget, where)
+    if not context:
+        return None
+    if cached is not None:
+        return iter([cached])
+
+    def pieces():
+        parts = []
+        for text in stream_gemini_api(query, context, api_key, model_name):
+            parts.append(text)
+            yield text
+        # Only complete answers are cached
+        if answer_cache is not None and parts:
+            answer_cache.put(key, query, "".join(parts).strip(), query_embedding)
+
+    return pieces()
+
+def tenant_scope(collection_name: str, tenant: Optional[str],
+                 shard_by_tenant: bool = False) -> Tuple[str, Optional[Dict]]:
+    """Collection to use for a tenant and the filter that keeps retrieval inside it.
+
+    With shard_by_tenant every tenant has its own collection, so searches only touch that
+    tenant's chunks; otherwise tenants share the collection. The tenant filter is returned
+    in both cases, so even a shard name collision cannot leak another tenant's chunks.
+    """
+    if not tenant:
+        return collection_name, None
+    if shard_by_tenant:
+        return shard_name(collection_name, tenant), {"tenant": tenant}
+    return collection_name, {"tenant": tenant}
+
+def open_query_collection(collection_name: str, tenant: Optional[str], shard_by_tenant: bool = False,
+                          persist_dir: str = "./chroma_db"):
+    """Collection to query and its tenant filter; a sharded store without a tenant is searched across all shards."""
+    client = get_chroma_client(persist_dir)
+    if shard_by_tenant and not tenant:
+        return ShardedCollection(client, collection_name), None
+    name, where = tenant_scope(collection_name, tenant, shard_by_tenant)
+    return client.get_or_create_collection(name=name), where
@@ -0,0 +1,115 @@
+import hashlib
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+SHARD_SEPARATOR = "__"
+
+# Shard queries from every view share one pool, so views can be rebuilt freely
+# (e.g. after each ingest in server mode) without leaving idle threads behind
+MAX_SHARD_WORKERS = 8
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _shard_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_SHARD_WORKERS, thread_name_prefix="shard-query")
+        return _executor
+
+
+def shard_name(base_name: str, tenant: str) -> str:
+    """Collection name for a tenant's shard, e.g. pdf_chunks__acme-1a2b3c4d.
+
+    The readable part replaces characters Chroma does not allow with '-' and is cut to
+    fit Chroma's 63-character limit; the hash of the raw tenant keeps tenants such as
+    "acme.co" and "acme-co" in different shards.
+    """
+    if not tenant or not tenant.strip():
+        raise ValueError("Tenant cannot be empty.")
+    digest = hashlib.sha1(tenant.encode("utf-8")).hexdigest()[:8]
+    safe_tenant = re.sub(r"[^A-Za-z0-9_-]", "-", tenant.strip()).strip("-_") or "tenant"
+    prefix = f"{base_name}{SHARD_SEPARATOR}{safe_tenant}"[:63 - len(digest) - 1].rstrip("-_")
+    return f"{prefix}-{digest}"
+
+
+def list_shards(client, base_name: str) -> List[str]:
+    """Names of the existing tenant shards of a base collection."""
+    prefix = f"{base_name}{SHARD_SEPARATOR}"
+    names = []
+    for collection in client.list_collections():
+        # Chroma >= 0.6 returns names, older versions return Collection objects
+        name = collection if isinstance(collection, str) else collection.name
+        if name.startswith(prefix):
+            names.append(name)
+    return sorted(names)
+
+
+class ShardedCollection:
+    """Read-only view over per-tenant shard collections with the query/get/count API of a Chroma collection.
+
+    Queries fan out to every shard in parallel and the per-shard top-k lists are merged
+    by distance, so retrieval code written for one collection works unchanged. Queries
+    for a single tenant should use that tenant's shard directly; this view is for
+    searches that span tenants.
+    """
+
+    def __init__(self, client, base_name: str, tenants: Optional[Sequence[str]] = None):
+        self.name = base_name
+        names = [shard_name(base_name, tenant) for tenant in tenants] if tenants else list_shards(client, base_name)
+        existing = set(list_shards(client, base_name))
+        self.shards = [client.get_collection(name=name) for name in names if name in existing]
+        self._executor = _shard_executor()
+
+    def count(self) -> int:
+        return sum(self._executor.map(lambda shard: shard.count(), self.shards))
+
+    def query(self, query_embeddings, n_results: int = 10, where: Optional[Dict] = None,
+              where_document: Optional[Dict] = None,
+              include: Sequence[str] = ("documents", "metadatas", "distances")) -> Dict:
+        """Queries every shard in parallel and keeps the n_results nearest hits per query."""
+        fields = [field for field in include if field != "distances"]
+
+        def query_shard(shard):
+            # A shard smaller than n_results would otherwise make Chroma warn or fail
+            limit = min(n_results, shard.count())
+            if limit == 0:
+                return None
+            return shard.query(query_embeddings=query_embeddings, n_results=limit, where=where,
+                               where_document=where_document, include=fields + ["distances"])
+
+        partials = [result for result in self._executor.map(query_shard, self.shards) if result is not None]
+        merged: Dict[str, List] = {"ids": []}
+        for field in include:
+            merged[field] = []
+        for i in range(len(query_embeddings)):
+            hits = []
+            for result in partials:
+                for j, cid in enumerate(result["ids"][i]):
+                    hits.append((result["distances"][i][j], cid, result, j))
+            hits.sort(key=lambda hit: hit[0])
+            hits = hits[:n_results]
+            merged["ids"].append([cid for _, cid, _, _ in hits])
+            for field in include:
+                merged[field].append([result[field][i][j] for _, _, result, j in hits])
+        return merged
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None,
+            where_document: Optional[Dict] = None, include: Sequence[str] = ("documents", "metadatas")) -> Dict:
+        """Fetches records by ID and/or filter from every shard (no paging across shards)."""
+        include = list(include)
+
+        def get_shard(shard):
+            return shard.get(ids=ids, where=where, where_document=where_document, include=include)
+
+        merged: Dict[str, List] = {"ids": []}
+        for field in include:
+            merged[field] = []
+        for result in self._executor.map(get_shard, self.shards):
+            merged["ids"].extend(result["ids"])
+            for field in include:
+                merged[field].extend(result.get(field) or [None] * len(result["ids"]))
+        return merged
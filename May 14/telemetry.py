@@ -0,0 +1,288 @@
+import contextvars
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Latency buckets in seconds, from a cached embedding lookup up to a slow LLM call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, math.inf)
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("pdf_chat_current_span", default=None)
+
+
+class Span:
+    """One timed stage. Spans opened inside another span's block become its children."""
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.attributes = dict(attributes)
+        self.start_time = time.time()
+        self.duration = 0.0
+        self.error: Optional[str] = None
+        self._start = time.perf_counter()
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+
+class Exporter:
+    """Base exporter; subclasses override the hooks they need."""
+
+    def attach(self, telemetry: "Telemetry"):
+        pass
+
+    def on_start(self, span: Span):
+        pass
+
+    def on_end(self, span: Span):
+        pass
+
+    def flush(self, telemetry: "Telemetry"):
+        pass
+
+
+class Telemetry:
+    """Collects spans, counters and latency histograms and hands them to exporters.
+
+    Counters and histograms are always aggregated in memory (cheap dict updates), so
+    metrics can be exported on demand even when no exporter is attached.
+    """
+
+    def __init__(self, exporters: Optional[List[Exporter]] = None, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.exporters: List[Exporter] = []
+        self.buckets = buckets
+        self._counters: Dict[Tuple, float] = {}
+        self._histograms: Dict[Tuple, List] = {}
+        self._lock = threading.Lock()
+        for exporter in exporters or []:
+            self.add_exporter(exporter)
+
+    def add_exporter(self, exporter: Exporter):
+        exporter.attach(self)
+        self.exporters.append(exporter)
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        """Times the block as a span and records its duration in the stage_seconds histogram."""
+        span = Span(name, _current_span.get(), attributes)
+        token = _current_span.set(span)
+        for exporter in self.exporters:
+            exporter.on_start(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            span.duration = time.perf_counter() - span._start
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # Generators can finish a span from a different context than the one that opened it
+                _current_span.set(span.parent)
+            self.observe("stage_seconds", span.duration, stage=name)
+            if span.error:
+                self.incr("stage_errors", stage=name)
+            for exporter in self.exporters:
+                exporter.on_end(span)
+
+    def incr(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                # Per-bucket counts, then sum and count
+                histogram = self._histograms[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[0][i] += 1
+                    break
+            histogram[1] += value
+            histogram[2] += 1
+
+    def snapshot(self) -> Dict:
+        """Returns a copy of the counters and histograms (bucket counts are not cumulative)."""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "histograms": {key: (list(h[0]), h[1], h[2]) for key, h in self._histograms.items()},
+            }
+
+    def prometheus_text(self, prefix: str = "pdf_chat") -> str:
+        """Renders all metrics in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+        typed = set()
+
+        for (name, labels), value in sorted(snapshot["counters"].items()):
+            metric = f"{prefix}_{name}_total"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} counter")
+                typed.add(metric)
+            lines.append(f"{metric}{_format_labels(labels)} {_format_value(value)}")
+
+        for (name, labels), (counts, total, count) in sorted(snapshot["histograms"].items()):
+            metric = f"{prefix}_{name}"
+            if metric not in typed:
+                lines.append(f"# TYPE {metric} histogram")
+                typed.add(metric)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = "+Inf" if math.isinf(bound) else repr(bound)
+                lines.append(f"{metric}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        for exporter in self.exporters:
+            exporter.flush(self)
+
+
+def _format_labels(labels: Tuple) -> str:
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class LogExporter(Exporter):
+    """Writes one log line per finished span and a counter summary on flush."""
+
+    def __init__(self, logger: Optional[logging.Logger] = None, level: int = logging.INFO):
+        self.logger = logger or logging.getLogger("pdf_chat.telemetry")
+        self.level = level
+
+    def on_end(self, span: Span):
+        fields = [f"span={span.name}", f"duration_ms={span.duration * 1000:.1f}", f"trace={span.trace_id[:16]}"]
+        if span.parent is not None:
+            fields.append(f"parent={span.parent.name}")
+        if span.error:
+            fields.append(f"error={span.error}")
+        fields.extend(f"{key}={value}" for key, value in span.attributes.items())
+        self.logger.log(self.level, " ".join(fields))
+
+    def flush(self, telemetry: Telemetry):
+        counters = telemetry.snapshot()["counters"]
+        if counters:
+            self.logger.log(self.level, "counters " + " ".join(
+                f"{name}{_format_labels(labels)}={_format_value(value)}"
+                for (name, labels), value in sorted(counters.items())
+            ))
+
+
+class PrometheusFileExporter(Exporter):
+    """Writes metrics to a file for node_exporter's textfile collector.
+
+    The file is rewritten atomically when a root span ends (at most once per
+    interval seconds) and on every explicit flush.
+    """
+
+    def __init__(self, path: str, prefix: str = "pdf_chat", interval: float = 10.0):
+        self.path = path
+        self.prefix = prefix
+        self.interval = interval
+        self.telemetry: Optional[Telemetry] = None
+        self._last_write = 0.0
+
+    def attach(self, telemetry: Telemetry):
+        self.telemetry = telemetry
+
+    def on_end(self, span: Span):
+        if span.parent is None and self.telemetry is not None and time.monotonic() - self._last_write >= self.interval:
+            self.flush(self.telemetry)
+
+    def flush(self, telemetry: Telemetry):
+        self._last_write = time.monotonic()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(telemetry.prometheus_text(self.prefix))
+        os.replace(tmp_path, self.path)
+
+
+class OpenTelemetryExporter(Exporter):
+    """Mirrors spans into OpenTelemetry so any configured OTel exporter (OTLP, Jaeger, console) receives them.
+
+    Requires the opentelemetry-api package; without a configured TracerProvider the
+    spans are no-ops, as usual for OpenTelemetry.
+    """
+
+    def __init__(self, tracer_provider=None, service_name: str = "pdf_chat"):
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            raise ValueError("The OpenTelemetry exporter requires the 'opentelemetry-api' package.")
+        self._trace = trace
+        self.tracer = trace.get_tracer(service_name, tracer_provider=tracer_provider)
+        self._spans: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def on_start(self, span: Span):
+        context = None
+        if span.parent is not None:
+            with self._lock:
+                parent = self._spans.get(span.parent.span_id)
+            if parent is not None:
+                context = self._trace.set_span_in_context(parent)
+        otel_span = self.tracer.start_span(span.name, context=context, attributes=span.attributes,
+                                           start_time=int(span.start_time * 1e9))
+        with self._lock:
+            self._spans[span.span_id] = otel_span
+
+    def on_end(self, span: Span):
+        with self._lock:
+            otel_span = self._spans.pop(span.span_id, None)
+        if otel_span is None:
+            return
+        for key, value in span.attributes.items():
+            otel_span.set_attribute(key, value)
+        if span.error:
+            otel_span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, span.error))
+        otel_span.end(end_time=int((span.start_time + span.duration) * 1e9))
+
+
+def exporter_from_spec(spec: str) -> Exporter:
+    """Builds an exporter from a CLI spec: 'log', 'prometheus=PATH' or 'otel'."""
+    kind, _, arg = spec.partition("=")
+    if kind == "log":
+        return LogExporter()
+    if kind == "prometheus":
+        if not arg:
+            raise ValueError("The prometheus exporter needs a file path, e.g. prometheus=metrics.prom")
+        return PrometheusFileExporter(arg)
+    if kind == "otel":
+        return OpenTelemetryExporter()
+    raise ValueError(f"Unknown telemetry exporter '{spec}'; use log, prometheus=PATH or otel.")
+
+
+_telemetry = Telemetry()
+
+
+def get_telemetry() -> Telemetry:
+    """Returns the process-wide Telemetry instance."""
+    return _telemetry
+
+
+def configure(specs: List[str]) -> Telemetry:
+    """Attaches exporters built from specs to the process-wide instance."""
+    for spec in specs:
+        _telemetry.add_exporter(exporter_from_spec(spec))
+    return _telemetry
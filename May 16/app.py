@@ -1,12 +1,28 @@
 # Import required libraries
+import argparse
 import autogen
 import os
+import sys
+
+from llm_cache import ReplayMissError, SQLiteLLMCache
+import pooled_executor
+
+# Command-line options for the response cache
+parser = argparse.ArgumentParser(description="AutoGen assistant backed by Gemini.")
+parser.add_argument("--cache", default="llm_cache.sqlite",
+                    help="SQLite file for cached LLM responses (empty to disable)")
+parser.add_argument("--replay", action="store_true",
+                    help="Run offline from the cache; fails if a turn was never recorded")
+args = parser.parse_args()
+if args.replay and not args.cache:
+    parser.error("--replay needs --cache")
 
 # Set up the configuration list for AutoGen using Gemini API directly
 config_list = [
     {
         "model": "models/gemini-2.0-flash-001",  
-        "api_key": os.getenv("API Key"),  
+        # Replay never reaches the API, so it does not need a real key
+        "api_key": os.getenv("API Key") or ("replay" if args.replay else None),  
         "api_type": "google"  
     }
 ]
@@ -24,16 +40,33 @@ assistant = autogen.AssistantAgent(
     llm_config=llm_config
 )
 
+# Run generated code in pre-warmed sandbox workers with CPU, memory and output limits;
+# each turn gets a fresh scratch directory under web/
+if pooled_executor.SUPPORTED:
+    code_executor = pooled_executor.PooledCodeExecutor(
+        work_dir="web",
+        pool_size=2,
+        timeout=60,
+        cpu_seconds=30,
+        memory_mb=512,
+        max_output_bytes=64 * 1024
+    )
+    code_execution_config = {"executor": code_executor}
+else:
+    # No fork() on Windows: fall back to AutoGen's local executor without limits
+    code_executor = None
+    code_execution_config = {
+        "working_directory": "web",
+        "llm_config": llm_config
+    }
+
 # Create the User Proxy Agent
 user_proxy = autogen.UserProxyAgent(
     name="user_proxy",
-    human_input_mode="TERMINATE",
+    human_input_mode="NEVER" if args.replay else "TERMINATE",  # replays run unattended
     max_consecutive_auto_reply=10,
     is_termination_msg=lambda x: x.get("content", "").rstrip().endswith("TERMINATE"),
-    code_execution_config={
-        "working_directory": "web",
-        "llm_config": llm_config
-    },
+    code_execution_config=code_execution_config,
     system_message="""A useful user proxy agent that can execute code and terminate the conversation when the task is done.
     You should terminate the conversation with the keyword 'TERMINATE' at the end of the message when the task is done.
     """
@@ -42,8 +75,28 @@ user_proxy = autogen.UserProxyAgent(
 # Define the task
 task = """Write Python code to output numbers 1 to 100 and then store it in a file"""
 
-# Initiate the chat between the user proxy and the assistant
-user_proxy.initiate_chat(
-    assistant,
-    message=task
-)
\ No newline at end of file
+# Initiate the chat between the user proxy and the assistant, serving repeated turns from the cache
+if args.cache:
+    cache = SQLiteLLMCache(args.cache, seed=llm_config["seed"], replay=args.replay)
+    try:
+        user_proxy.initiate_chat(
+            assistant,
+            message=task,
+            cache=cache
+        )
+    except ReplayMissError as e:
+        print(f"Replay failed: {str(e)}")
+        sys.exit(1)
+    finally:
+        stats = cache.stats()
+        print(f"LLM cache: {stats['hits']} hits, {stats['misses']} misses "
+              f"(hit rate {stats['hit_rate']:.0%}), {stats['entries']} stored responses.")
+        cache.close()
+else:
+    user_proxy.initiate_chat(
+        assistant,
+        message=task
+    )
+
+if code_executor is not None:
+    code_executor.stop()
\ No newline at end of file
@@ -0,0 +1,104 @@
+# SQLite-backed LLM response cache for AutoGen conversations.
+#
+# AutoGen builds one cache key per LLM call from the request (model, sampling
+# config and the full message history), so identical conversations hit the cache
+# turn after turn. In replay mode a miss raises instead of calling the model, which
+# lets recorded conversations run offline.
+import hashlib
+import json
+import pickle
+import sqlite3
+import threading
+import time
+
+
+class ReplayMissError(RuntimeError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+class SQLiteLLMCache:
+    """Implements AutoGen's AbstractCache protocol (get, set, close, context manager) on a SQLite file.
+
+    The connection stays open until close() is called.
+    """
+
+    def __init__(self, path: str = "llm_cache.sqlite", seed: int = 42, replay: bool = False):
+        self.path = path
+        self.seed = seed
+        self.replay = replay
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT, value BLOB NOT NULL, created REAL NOT NULL, "
+            "hits INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.commit()
+
+    def _hash(self, key: str) -> str:
+        # AutoGen's key is the JSON request; hashing keeps the index small and namespaces it by seed
+        return hashlib.sha256(f"{self.seed}:{key}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _model(key: str) -> str:
+        try:
+            return str(json.loads(key).get("model", ""))
+        except (ValueError, AttributeError):
+            return ""
+
+    def get(self, key: str, default=None):
+        digest = self._hash(key)
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM responses WHERE key = ?", (digest,)).fetchone()
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._conn.execute("UPDATE responses SET hits = hits + 1 WHERE key = ?", (digest,))
+                self._conn.commit()
+        if row is None:
+            if self.replay:
+                raise ReplayMissError("No recorded response for this conversation turn; "
+                                      "run once without --replay to record it.")
+            return default
+        return pickle.loads(row[0])
+
+    def set(self, key: str, value):
+        if self.replay:
+            return
+        data = pickle.dumps(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, value, created) VALUES (?, ?, ?, ?)",
+                (self._hash(key), self._model(key), data, time.time()),
+            )
+            self._conn.commit()
+            self.writes += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "entries": entries,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # AutoGen enters the cache around every single get and set, so leaving the
+    # context must not close the connection; the owner calls close() once at the end
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
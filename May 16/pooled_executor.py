@@ -0,0 +1,145 @@
+# AutoGen code executor backed by a pool of pre-warmed sandbox workers
+# (see sandbox_worker.py). Pass it to a UserProxyAgent through
+# code_execution_config={"executor": PooledCodeExecutor(...)}.
+import json
+import os
+import queue
+import re
+import select
+import subprocess
+import sys
+import tempfile
+import threading
+from typing import List
+
+from autogen.coding import CodeBlock, CodeExtractor, CodeResult, MarkdownCodeExtractor
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_worker.py")
+
+# Workers fork a child per run and apply POSIX resource limits, so Windows is not supported
+SUPPORTED = hasattr(os, "fork")
+
+_FILENAME_HINT = re.compile(r"^\s*(?:#|//)\s*filename:\s*(\S+)", re.IGNORECASE)
+
+
+class _Worker:
+    def __init__(self, preload):
+        self.process = subprocess.Popen(
+            [sys.executable, "-u", WORKER_SCRIPT, "--preload", *preload],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        )
+        self.receive(timeout=30)
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def send(self, request: dict):
+        self.process.stdin.write(json.dumps(request) + "\n")
+        self.process.stdin.flush()
+
+    def receive(self, timeout: float) -> dict:
+        ready, _, _ = select.select([self.process.stdout], [], [], timeout)
+        line = self.process.stdout.readline() if ready else ""
+        if not line:
+            raise RuntimeError("Sandbox worker stopped responding.")
+        return json.loads(line)
+
+    def stop(self):
+        if self.alive():
+            self.process.kill()
+        self.process.wait()
+
+
+class PooledCodeExecutor:
+    """Runs code blocks in pooled sandbox workers with per-run limits.
+
+    Each execute_code_blocks() call borrows one warm worker and a fresh scratch
+    directory under work_dir; every block in the call runs there in a forked child
+    limited to cpu_seconds of CPU, memory_mb of address space and max_output_bytes
+    of captured output, and is killed after timeout seconds of wall time. Workers
+    return to the pool afterwards; a worker that dies is replaced.
+    """
+
+    def __init__(self, work_dir: str = "web", pool_size: int = 2, timeout: float = 60.0,
+                 cpu_seconds: int = 30, memory_mb: int = 512, max_output_bytes: int = 64 * 1024,
+                 max_file_mb: int = 100, preload: List[str] = ()):
+        if not SUPPORTED:
+            raise RuntimeError("PooledCodeExecutor needs os.fork (Linux or macOS).")
+        self.work_dir = os.path.abspath(work_dir)
+        os.makedirs(self.work_dir, exist_ok=True)
+        self.pool_size = pool_size
+        self.limits = {"timeout": timeout, "cpu_seconds": cpu_seconds, "memory_mb": memory_mb,
+                       "max_output_bytes": max_output_bytes, "max_file_mb": max_file_mb}
+        self.preload = list(preload)
+        self.runs = 0
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._start_workers()
+
+    @property
+    def code_extractor(self) -> CodeExtractor:
+        return MarkdownCodeExtractor()
+
+    def _start_workers(self):
+        for _ in range(self.pool_size):
+            self._idle.put(_Worker(self.preload))
+
+    def _acquire(self) -> _Worker:
+        worker = self._idle.get()
+        if not worker.alive():
+            worker = _Worker(self.preload)
+        return worker
+
+    def _scratch_dir(self) -> str:
+        with self._lock:
+            self.runs += 1
+            run = self.runs
+        return tempfile.mkdtemp(prefix=f"run-{run:04d}-", dir=self.work_dir)
+
+    def execute_code_blocks(self, code_blocks: List[CodeBlock]) -> CodeResult:
+        """Runs the blocks in order in one scratch directory, stopping at the first failure."""
+        scratch = self._scratch_dir()
+        worker = self._acquire()
+        outputs = []
+        exit_code = 0
+        try:
+            for block in code_blocks:
+                language = block.language.lower()
+                filename = None
+                first_line = block.code.lstrip().splitlines()[0] if block.code.strip() else ""
+                match = _FILENAME_HINT.match(first_line)
+                if match:
+                    # Keep a copy of the code under the name the assistant gave it
+                    filename = os.path.join(scratch, os.path.basename(match.group(1)))
+                    with open(filename, "w", encoding="utf-8") as f:
+                        f.write(block.code)
+
+                request = dict(self.limits, code=block.code, language=language, cwd=scratch, filename=filename)
+                try:
+                    worker.send(request)
+                    result = worker.receive(self.limits["timeout"] + 10)
+                except (OSError, RuntimeError, ValueError) as e:
+                    worker.stop()
+                    worker = _Worker(self.preload)
+                    result = {"exit_code": 1, "output": f"Sandbox worker failed: {str(e)}"}
+
+                outputs.append(result["output"])
+                exit_code = result["exit_code"]
+                if exit_code != 0:
+                    break
+        finally:
+            self._idle.put(worker)
+        return CodeResult(exit_code=exit_code, output="\n".join(outputs))
+
+    def restart(self):
+        """Replaces every worker with a fresh one."""
+        self.stop()
+        self._start_workers()
+
+    def stop(self):
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            worker.stop()
@@ -0,0 +1,183 @@
+# Pre-warmed code runner used by pooled_executor.PooledCodeExecutor.
+#
+# The worker starts once, imports anything listed in --preload, then reads one JSON
+# request per line from stdin. Each request runs in a forked child with CPU time,
+# memory and file-size limits, in its own process group and working directory, so
+# a run pays neither interpreter startup nor import time, and a runaway run can be
+# killed without taking the worker down. One JSON result per line goes to stdout.
+import argparse
+import importlib
+import json
+import os
+import resource
+import select
+import signal
+import sys
+import time
+import traceback
+
+PYTHON_LANGUAGES = ("python", "py", "python3")
+SHELL_LANGUAGES = ("bash", "sh", "shell")
+
+
+def _apply_limits(request):
+    cpu_seconds = request["cpu_seconds"]
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+    memory = request["memory_mb"] * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    file_size = request["max_file_mb"] * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_FSIZE, (file_size, file_size))
+
+
+def _child(request, write_fd):
+    # Runs in the forked child and never returns
+    exit_code = 1
+    try:
+        os.setsid()
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.dup2(write_fd, 1)
+        os.dup2(write_fd, 2)
+        os.chdir(request["cwd"])
+        _apply_limits(request)
+
+        language = request["language"]
+        if language in SHELL_LANGUAGES:
+            os.execvp("bash", ["bash", "-c", request["code"]])
+
+        sys.stdout = os.fdopen(1, "w", buffering=1)
+        sys.stderr = os.fdopen(2, "w", buffering=1)
+        sys.argv = ["<code>"]
+        sys.path.insert(0, request["cwd"])
+        namespace = {"__name__": "__main__", "__builtins__": __builtins__}
+        try:
+            exec(compile(request["code"], request.get("filename") or "<code>", "exec"), namespace)
+            exit_code = 0
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            if e.code is not None and not isinstance(e.code, int):
+                print(e.code, file=sys.stderr)
+        except BaseException:
+            # Drop this module's exec frame so the traceback starts at the generated code
+            error_type, error, tb = sys.exc_info()
+            traceback.print_exception(error_type, error, tb.tb_next)
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(exit_code)
+
+
+def _kill_group(pid: int):
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def run(request):
+    """Runs one code block in a limited child process and returns its result."""
+    if request["language"] not in PYTHON_LANGUAGES + SHELL_LANGUAGES:
+        return {"exit_code": 1, "output": f"Unsupported language: {request['language']}",
+                "truncated": False, "timed_out": False, "seconds": 0.0}
+
+    read_fd, write_fd = os.pipe()
+    start = time.monotonic()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        _child(request, write_fd)
+    os.close(write_fd)
+
+    max_output = request["max_output_bytes"]
+    deadline = start + request["timeout"]
+    # Keep the start and the end of long output; tracebacks end up at the end
+    head, tail, size = bytearray(), bytearray(), 0
+    status, timed_out = None, False
+    while True:
+        remaining = deadline - time.monotonic()
+        if status is None:
+            reaped, status = os.waitpid(pid, os.WNOHANG)
+            if reaped:
+                # Background processes the run left behind would otherwise hold the pipe open
+                _kill_group(pid)
+            elif remaining <= 0:
+                timed_out = True
+                _kill_group(pid)
+                _, status = os.waitpid(pid, 0)
+            else:
+                status = None
+        elif remaining <= -1:
+            # Only descendants that escaped the process group can still be writing
+            break
+        ready, _, _ = select.select([read_fd], [], [], 0.1)
+        if not ready:
+            continue
+        data = os.read(read_fd, 65536)
+        if not data:
+            break
+        size += len(data)
+        # Keep draining past the limit so the child never blocks on a full pipe
+        room = max_output // 2 - len(head)
+        if room > 0:
+            head += data[:room]
+            data = data[room:]
+        tail += data
+        del tail[:-(max_output - max_output // 2)]
+    os.close(read_fd)
+    if status is None:
+        _, status = os.waitpid(pid, 0)
+        _kill_group(pid)
+
+    truncated = size > max_output
+    if truncated:
+        omitted = size - len(head) - len(tail)
+        raw = bytes(head) + f"\n[... {omitted} bytes of output omitted ...]\n".encode("utf-8") + bytes(tail)
+    else:
+        raw = bytes(head + tail)
+    output = raw.decode("utf-8", errors="replace")
+    if os.WIFSIGNALED(status):
+        signum = os.WTERMSIG(status)
+        exit_code = 128 + signum
+        if timed_out:
+            output += f"\nTimeout: killed after {request['timeout']}s of wall time."
+        elif signum in (signal.SIGXCPU, signal.SIGKILL):
+            output += f"\nKilled: CPU time limit of {request['cpu_seconds']}s exceeded."
+        elif signum == signal.SIGXFSZ:
+            output += f"\nKilled: file size limit of {request['max_file_mb']} MB exceeded."
+        else:
+            output += f"\nKilled by signal {signum}."
+    else:
+        exit_code = os.WEXITSTATUS(status)
+    return {"exit_code": exit_code, "output": output, "truncated": truncated,
+            "timed_out": timed_out, "seconds": time.monotonic() - start}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sandboxed code runner for PooledCodeExecutor.")
+    parser.add_argument("--preload", nargs="*", default=[], help="Modules to import once at startup")
+    args = parser.parse_args()
+    for module in args.preload:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+
+    # Signals readiness to the pool
+    sys.stdout.write(json.dumps({"ready": True}) + "\n")
+    sys.stdout.flush()
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            result = run(json.loads(line))
+        except Exception as e:
+            result = {"exit_code": 1, "output": f"Sandbox error: {str(e)}", "truncated": False,
+                      "timed_out": False, "seconds": 0.0}
+        sys.stdout.write(json.dumps(result) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
+import argparse
 import asyncio
+import time
 
 from autogen_agentchat.agents import AssistantAgent
 from autogen_agentchat.conditions import TextMentionTermination
@@ -7,13 +9,11 @@ from autogen_agentchat.ui import Console
 from autogen_ext.models.openai import OpenAIChatCompletionClient
 
 
-async def main():
-    # Create the model client
-    model_client = OpenAIChatCompletionClient(
-        model="gemini-1.5-flash-8b",
-        api_key="your_api_key_here",
-    )
+TASK = "Plan a 3 day trip to China."
+
 
+def create_agents(model_client):
+    # All agents share one model client (and its HTTP connection pool)
     planner_agent = AssistantAgent(
         "planner_agent",
         model_client=model_client,
@@ -45,14 +45,88 @@ async def main():
         ),
     )
 
+    return planner_agent, local_agent, language_agent, travel_summary_agent
+
+
+async def run_round_robin(agents, task: str):
     termination = TextMentionTermination("TERMINATE")
-    group_chat = RoundRobinGroupChat(
-        [planner_agent, local_agent, language_agent, travel_summary_agent],
-        termination_condition=termination
+    group_chat = RoundRobinGroupChat(list(agents), termination_condition=termination)
+    await Console(group_chat.run_stream(task=task))
+
+
+async def run_agent(agent, task: str, semaphore: asyncio.Semaphore, timings: dict) -> str:
+    """Runs one agent on a task and records its wall time and token usage."""
+    async with semaphore:
+        start = time.perf_counter()
+        result = await agent.run(task=task)
+        elapsed = time.perf_counter() - start
+
+    usage = [message.models_usage for message in result.messages if getattr(message, "models_usage", None)]
+    timings[agent.name] = {
+        "seconds": elapsed,
+        "prompt_tokens": sum(u.prompt_tokens for u in usage),
+        "completion_tokens": sum(u.completion_tokens for u in usage),
+    }
+    reply = result.messages[-1].content
+    print(f"---------- {agent.name} ({elapsed:.1f}s) ----------")
+    print(reply)
+    return reply
+
+
+async def run_parallel(agents, task: str, max_concurrency: int = 2) -> str:
+    """Fan-out/fan-in: the planner drafts a plan, the local and language agents review it
+    concurrently, and the summary agent merges all three into the final plan."""
+    planner_agent, local_agent, language_agent, travel_summary_agent = agents
+    semaphore = asyncio.Semaphore(max_concurrency)
+    timings = {}
+    start = time.perf_counter()
+
+    plan = await run_agent(planner_agent, task, semaphore, timings)
+
+    # The specialists only need the draft plan, not each other's output
+    specialist_task = f"{task}\n\nDraft travel plan from {planner_agent.name}:\n{plan}"
+    specialists = [local_agent, language_agent]
+    advice = await asyncio.gather(*(run_agent(agent, specialist_task, semaphore, timings) for agent in specialists))
+
+    sections = [f"{planner_agent.name}:\n{plan}"]
+    sections.extend(f"{agent.name}:\n{reply}" for agent, reply in zip(specialists, advice))
+    summary_task = f"{task}\n\nSuggestions from the other agents:\n\n" + "\n\n".join(sections)
+    final_plan = await run_agent(travel_summary_agent, summary_task, semaphore, timings)
+
+    total = time.perf_counter() - start
+    print("---------- timings ----------")
+    for name, timing in timings.items():
+        print(f"{name:<22} {timing['seconds']:6.1f}s  {timing['prompt_tokens']:>6} prompt / "
+              f"{timing['completion_tokens']:>6} completion tokens")
+    sequential = sum(timing["seconds"] for timing in timings.values())
+    print(f"{'total':<22} {total:6.1f}s  (agents one after another: {sequential:.1f}s)")
+    return final_plan
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Multi-agent travel planner.")
+    parser.add_argument("--mode", choices=("round-robin", "parallel"), default="round-robin",
+                        help="round-robin: agents take turns in a group chat; parallel: independent "
+                             "specialists run concurrently and the summary agent merges their advice")
+    parser.add_argument("--max-concurrency", type=int, default=2,
+                        help="Maximum agents calling the model at once in parallel mode")
+    parser.add_argument("--task", default=TASK, help="Travel request")
+    args = parser.parse_args()
+
+    # Create the model client
+    model_client = OpenAIChatCompletionClient(
+        model="gemini-1.5-flash-8b",
+        api_key="your_api_key_here",
     )
-    await Console(group_chat.run_stream(task="Plan a 3 day trip to China."))
 
-    await model_client.close()
+    try:
+        agents = create_agents(model_client)
+        if args.mode == "parallel":
+            await run_parallel(agents, args.task, args.max_concurrency)
+        else:
+            await run_round_robin(agents, args.task)
+    finally:
+        await model_client.close()
 
 
 if __name__ == "__main__":